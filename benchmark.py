@@ -0,0 +1,343 @@
+"""Offline benchmarks for Nemesis against a synthetic onion web (no Tor or network needed)
+
+  python benchmark.py crawl [--mode socks|direct] [--duration 60] [--hosts 200] ...
+  python benchmark.py micro [--iterations 200] [--terms 200]
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import random
+import socket
+import sys
+import tempfile
+import time
+import timeit
+
+import aiohttp
+import psutil
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+from pymongo import MongoClient
+
+import nemesis
+from nemesis import CONFIG, CrawlerUtils, FastLinkExtractor, KeywordMatcher, MongoManager, fingerprint, page_text, parse_page
+
+# A few real words scattered through the filler so keyword runs have something to find
+KEYWORDS = ['market', 'crypto', 'forum', 'wallet', 'escrow']
+VOCABULARY = [f"w{i:04d}" for i in range(2000)]
+
+def onion_host(seed, index):
+    # 56 base32 characters, the same shape as a v3 onion address
+    digest = hashlib.sha256(f"{seed}:{index}".encode('utf-8')).digest() + hashlib.sha256(f"{index}:{seed}".encode('utf-8')).digest()
+    return base64.b32encode(digest).decode('ascii').lower()[:56] + '.onion'
+
+class SyntheticWeb:
+    """Deterministic link graph of fake onion hosts with configurable latency, errors, page size and mirrors"""
+    def __init__(self, hosts=200, pages_per_host=20, links_per_page=10, page_bytes=20 * 1024, latency=0.2,
+                 jitter=0.1, error_rate=0.05, duplicate_fraction=0.1, dead_fraction=0.0, seed=1):
+        self.hosts = [onion_host(seed, i) for i in range(hosts)]
+        self.index = {host: i for i, host in enumerate(self.hosts)}
+        self.pages_per_host = pages_per_host
+        self.links_per_page = links_per_page
+        self.page_bytes = page_bytes
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        # The last hosts mirror the first ones and the ones before them never answer
+        self.canonical_hosts = max(1, int(hosts * (1 - duplicate_fraction)))
+        self.live_hosts = max(1, int(self.canonical_hosts * (1 - dead_fraction)))
+        self._random = random.Random(seed)
+
+    def url(self, host_index, page=0):
+        return f"http://{self.hosts[host_index]}/p/{page}"
+
+    def render(self, host_index, page):
+        source = host_index if host_index < self.canonical_hosts else host_index % self.canonical_hosts
+        rng = random.Random(f"{self.seed}:{source}:{page}")
+        links = []
+        for _ in range(self.links_per_page):
+            # Half the links stay on the same host, like directory and forum pages
+            target = source if rng.random() < 0.5 else rng.randrange(len(self.hosts))
+            anchor = " ".join(rng.choice(VOCABULARY + KEYWORDS) for _ in range(3))
+            links.append(f'<a href="{self.url(target, rng.randrange(self.pages_per_host))}">{anchor}</a>')
+        parts = [f"<html><head><title>Page {page} of {self.hosts[source]}</title>"
+                 f'<meta name="description" content="synthetic page {source}/{page}"></head><body>',
+                 "<div><ul>" + "".join(f"<li>{link}</li>" for link in links) + "</ul></div>"]
+        size = sum(len(part) for part in parts)
+        while size < self.page_bytes:
+            words = " ".join(rng.choice(VOCABULARY) if rng.random() > 0.01 else rng.choice(KEYWORDS) for _ in range(60))
+            paragraph = f"<div><p><span>{words}</span></p></div>"
+            parts.append(paragraph)
+            size += len(paragraph)
+        parts.append('<script>var tracking = "ignored";</script></body></html>')
+        return "".join(parts)
+
+    async def handle(self, request):
+        host_index = self.index.get(request.host.split(':')[0])
+        if host_index is None:
+            return web.Response(status=404)
+        if self.live_hosts <= host_index < self.canonical_hosts:
+            # Dead hosts hang until the crawler's own timeout gives up, like an unreachable onion service
+            await asyncio.sleep(3600)
+        await asyncio.sleep(max(0.0, self._random.gauss(self.latency, self.jitter)))
+        if self._random.random() < self.error_rate:
+            return web.Response(status=503)
+        page = int(request.match_info.get('page', 0)) % self.pages_per_host
+        # Pages never change, so a validator derived from the page identity answers revisits with 304
+        etag = f'"{self.seed}-{host_index}-{page}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(text=self.render(host_index, page), content_type='text/html', headers={'ETag': etag})
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def _socks5_session(reader, writer, http_port):
+    """Minimal SOCKS5 CONNECT (no auth) that sends every destination to the synthetic web server"""
+    try:
+        _, methods = await reader.readexactly(2)
+        await reader.readexactly(methods)
+        writer.write(b'\x05\x00')
+        _, _, _, address_type = await reader.readexactly(4)
+        if address_type == 1:
+            await reader.readexactly(4)
+        elif address_type == 3:
+            await reader.readexactly((await reader.readexactly(1))[0])
+        elif address_type == 4:
+            await reader.readexactly(16)
+        await reader.readexactly(2)
+        upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', http_port)
+        writer.write(b'\x05\x00\x00\x01' + bytes(6))
+        await writer.drain()
+        await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+async def _serve(web_options, endpoints, ready):
+    synthetic = SyntheticWeb(**web_options)
+    app = web.Application()
+    app.router.add_get('/', synthetic.handle)
+    app.router.add_get('/p/{page}', synthetic.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    await web.SockSite(runner, sock).start()
+    http_port = sock.getsockname()[1]
+    servers = [await asyncio.start_server(lambda r, w: _socks5_session(r, w, http_port), '127.0.0.1', 0) for _ in range(endpoints)]
+    ready.put((http_port, [server.sockets[0].getsockname()[1] for server in servers]))
+    await asyncio.Event().wait()
+
+def _run_server(web_options, endpoints, ready):
+    asyncio.run(_serve(web_options, endpoints, ready))
+
+class OnionResolver(AbstractResolver):
+    """Resolves every host to the local synthetic web server for direct-connector runs"""
+    def __init__(self, port):
+        self.port = port
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{'hostname': host, 'host': '127.0.0.1', 'port': self.port, 'family': socket.AF_INET, 'proto': 0, 'flags': socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+class ProcessSampler:
+    """Tracks CPU seconds and peak RSS of this process and its parse workers, excluding the server process"""
+    def __init__(self, exclude_pid):
+        self.exclude_pid = exclude_pid
+        self.cpu = {}
+        self.peak_rss = 0
+
+    def sample(self):
+        me = psutil.Process()
+        processes = [me] + [child for child in me.children(recursive=True) if child.pid != self.exclude_pid]
+        rss = 0
+        for process in processes:
+            try:
+                times = process.cpu_times()
+                # CPU times only grow, so the last reading before a worker exits is its total
+                self.cpu[process.pid] = max(self.cpu.get(process.pid, 0.0), times.user + times.system)
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    async def run(self, interval=0.5):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    @property
+    def cpu_seconds(self):
+        return sum(self.cpu.values())
+
+async def _crawl(options, http_port, socks_ports, sampler):
+    output_dir = options.output_dir or tempfile.mkdtemp(prefix='nemesis-bench-')
+    argv = ['-o', output_dir, '-s', f"http://{onion_host(options.seed, 0)}/p/0", '--metrics-port', '0']
+    for keyword in options.keyword or []:
+        argv += ['-k', keyword]
+    args = nemesis.build_arg_parser().parse_args(argv)
+    args.time = options.duration / 60
+    args.matcher = KeywordMatcher.from_args(args.keyword)
+    if options.mode == 'socks':
+        CONFIG['TOR_PROXIES'] = [f"socks5://127.0.0.1:{port}" for port in socks_ports]
+        connector = None
+    else:
+        connector = aiohttp.TCPConnector(resolver=OnionResolver(http_port))
+    sampler_task = asyncio.create_task(sampler.run())
+    # Crawler output and the progress bar would drown the report, so they are discarded unless asked for
+    output = contextlib.nullcontext() if options.verbose else contextlib.redirect_stderr(io.StringIO())
+    try:
+        with output, contextlib.redirect_stdout(sys.stdout if options.verbose else io.StringIO()):
+            await nemesis.main(args, connector=connector)
+    finally:
+        sampler.sample()
+        sampler_task.cancel()
+    return output_dir
+
+def run_crawl(options):
+    web_options = {
+        'hosts': options.hosts, 'pages_per_host': options.pages_per_host, 'links_per_page': options.links,
+        'page_bytes': options.page_kb * 1024, 'latency': options.latency, 'jitter': options.jitter,
+        'error_rate': options.error_rate, 'duplicate_fraction': options.duplicates,
+        'dead_fraction': options.dead, 'seed': options.seed
+    }
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_run_server, args=(web_options, options.endpoints, ready), daemon=True)
+    server.start()
+    try:
+        http_port, socks_ports = ready.get(timeout=30)
+        CONFIG['DB_NAME'] = options.mongo_db
+        CONFIG['MONGO_URI'] = options.mongo_uri
+        CONFIG['CONCURRENT_REQUESTS'] = options.concurrency
+        CONFIG['REQUEST_DELAY'] = options.delay
+        sampler = ProcessSampler(server.pid)
+        output_dir = asyncio.run(_crawl(options, http_port, socks_ports, sampler))
+    finally:
+        server.terminate()
+        server.join()
+    snapshot = nemesis.metrics.snapshot()
+    pages = nemesis.metrics.total('pages')
+    fetch = snapshot['stages'].get('fetch', {})
+    return {
+        'mode': options.mode,
+        'duration_seconds': options.duration,
+        'pages': pages,
+        'pages_per_sec': round(pages / options.duration, 3),
+        'fetch_p50_seconds': round(fetch.get('p50', 0.0), 4),
+        'fetch_p99_seconds': round(fetch.get('p99', 0.0), 4),
+        'cpu_seconds_per_page': round(sampler.cpu_seconds / pages, 4) if pages else None,
+        'peak_rss_mb': round(sampler.peak_rss / (1024 * 1024), 1),
+        'bytes_downloaded': nemesis.metrics.total('bytes_downloaded'),
+        'fetch_results': {key: value for key, value in snapshot['counters'].items() if key.startswith(('fetches', 'host_probes'))},
+        'output_dir': output_dir
+    }
+
+def _time(function, iterations):
+    # Best of three runs, which is the least disturbed by other load on the host
+    return min(timeit.repeat(function, number=iterations, repeat=3)) / iterations
+
+async def _mongo_write(iterations, html):
+    manager = MongoManager()
+    if manager.collection is None:
+        await manager.close()
+        return None
+    links = {f"http://{onion_host(0, i)}/" for i in range(20)}
+    started = time.perf_counter()
+    for i in range(iterations):
+        await manager.save_page(f"http://{onion_host(1, i)}/p/0", "success", links, html)
+    # close() drains the buffer, so the timing covers the bulk writes and not just the enqueue
+    await manager.close()
+    elapsed = time.perf_counter() - started
+    db = MongoClient(CONFIG['MONGO_URI'])[CONFIG['DB_NAME']]
+    for name in (CONFIG['COLLECTION_NAME'], CONFIG['BLOB_COLLECTION'], CONFIG['LINKS_COLLECTION']):
+        db[name].drop()
+    return elapsed / iterations
+
+def _fast_links(html, base_url):
+    # Links only, like extract_onion_links; SimHash has its own row
+    extractor = FastLinkExtractor()
+    extractor.feed(html)
+    return extractor.page(base_url)['links']
+
+def run_micro(options):
+    synthetic = SyntheticWeb(page_bytes=options.page_kb * 1024, links_per_page=options.links, seed=options.seed)
+    html = synthetic.render(0, 0)
+    base_url = synthetic.url(0)
+    matcher = KeywordMatcher([f"term{i:03d}" for i in range(options.terms)] + KEYWORDS)
+    text = page_text(nemesis.BeautifulSoup(html, 'html.parser'))
+    cases = [
+        ('extract_onion_links', lambda: CrawlerUtils.extract_onion_links(html, base_url)),
+        ('fast_link_extractor', lambda: _fast_links(html, base_url)),
+        ('check_keyword', lambda: CrawlerUtils.check_keyword(html, 'market')),
+        (f'parse_page ({len(matcher.keywords)} terms)', lambda: parse_page(html, base_url, matcher)),
+        (f'keyword_match ({len(matcher.keywords)} terms)', lambda: matcher.match(text)),
+        ('fingerprint', lambda: fingerprint(text)),
+    ]
+    results = {'page_bytes': len(html)}
+    for name, function in cases:
+        results[f"{name}_ms"] = round(_time(function, options.iterations) * 1000, 3)
+    CONFIG['DB_NAME'] = options.mongo_db
+    CONFIG['MONGO_URI'] = options.mongo_uri
+    mongo = asyncio.run(_mongo_write(options.iterations, html))
+    results['mongo_save_page_ms'] = round(mongo * 1000, 3) if mongo is not None else 'skipped (MongoDB not reachable)'
+    return results
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Nemesis")
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--page-kb', type=int, default=20, help='Approximate size of each synthetic page')
+    parser.add_argument('--links', type=int, default=10, help='Links per synthetic page')
+    parser.add_argument('--mongo-uri', default=CONFIG['MONGO_URI'])
+    parser.add_argument('--mongo-db', default='nemesis_benchmark', help='Kept separate so real crawl data is never touched')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help='Run main() end to end against the synthetic web')
+    crawl.add_argument('--mode', choices=['socks', 'direct'], default='socks',
+                       help='socks: through the local SOCKS5 stand-in; direct: plain TCP connector')
+    crawl.add_argument('--duration', type=float, default=60, help='Crawl time in seconds')
+    crawl.add_argument('--hosts', type=int, default=200)
+    crawl.add_argument('--pages-per-host', type=int, default=20)
+    crawl.add_argument('--latency', type=float, default=0.2, help='Mean response latency in seconds')
+    crawl.add_argument('--jitter', type=float, default=0.1, help='Standard deviation of the latency')
+    crawl.add_argument('--error-rate', type=float, default=0.05, help='Fraction of requests answered with 503')
+    crawl.add_argument('--duplicates', type=float, default=0.1, help='Fraction of hosts that mirror another host')
+    crawl.add_argument('--dead', type=float, default=0.0, help='Fraction of hosts that never answer')
+    crawl.add_argument('--endpoints', type=int, default=1, help='Number of SOCKS endpoints in socks mode')
+    crawl.add_argument('--concurrency', type=int, default=CONFIG['CONCURRENT_REQUESTS'])
+    crawl.add_argument('--delay', type=float, default=0.0, help='Per-request politeness delay')
+    crawl.add_argument('-k', '--keyword', action='append')
+    crawl.add_argument('-o', '--output-dir', help='Default: a new temporary directory')
+    crawl.add_argument('-v', '--verbose', action='store_true', help='Show the crawler output')
+
+    micro = commands.add_parser('micro', help='Time the parsing, matching and Mongo write paths on one page')
+    micro.add_argument('--iterations', type=int, default=200)
+    micro.add_argument('--terms', type=int, default=200, help='Number of keywords for the matcher benchmarks')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    options = parse_arguments()
+    results = run_crawl(options) if options.command == 'crawl' else run_micro(options)
+    for key, value in results.items():
+        print(f"{key:<32} {value}")
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -1,14 +1,17 @@
 import aiohttp
+from aiohttp import web
 from bs4 import BeautifulSoup
 import os
 import asyncio
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
 from tqdm.asyncio import tqdm_asyncio
 from tqdm import tqdm
 import psutil
-from aiohttp_socks import ProxyConnector
-from pybloom_live import ScalableBloomFilter
-from pymongo import MongoClient
+from aiohttp_socks import ProxyConnector, ProxyError, ProxyConnectionError, ProxyTimeoutError
+from pymongo import MongoClient, UpdateOne, InsertOne, DeleteMany
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timedelta, timezone
 import signal
 import sys
@@ -17,6 +20,22 @@ import socket
 import re
 import logging
 import random
+import sqlite3
+import itertools
+import time
+import bisect
+from contextlib import contextmanager, asynccontextmanager
+import json
+import struct
+import base64
+import binascii
+from array import array
+import codecs
+import gzip
+import hashlib
+import zlib
+import heapq
+from collections import Counter, OrderedDict, deque
 
 # Try to import colorama, fallback to basic colors if not available
 try:
@@ -31,6 +50,13 @@ except ImportError:
     class Style:
         RESET_ALL = '\033[0m'
 
+# Use the C Aho-Corasick automaton when pyahocorasick is installed, else the pure-Python one below
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 # Initialize colorama for cross-platform colored output (if available)
 if COLORAMA_AVAILABLE:
     init()
@@ -58,26 +84,113 @@ def show_help():
 Options:
   -h, --help            Show this help message and exit
   -k KEYWORD, --keyword KEYWORD
-                        Crawl and filter URLs containing the specified keyword
+                        Crawl and filter URLs containing the specified keyword (repeatable)
+  -K FILE, --keywords-file FILE
+                        Read keywords from a file, one per line (prefix regexes with re:)
+  -x REGEX, --regex REGEX
+                        Crawl and filter URLs matching the specified regex (repeatable)
   -t TIME, --time TIME  Set crawl duration in minutes (10-180, default: 30)
   -s START_URL, --start-url START_URL
                         Specify a custom .onion URL to start the crawl
   -o OUTPUT_DIR, --output-dir OUTPUT_DIR
-                        Specify a custom output directory for saving files""")
+                        Specify a custom output directory for saving files
+  -r RESUME_DIR, --resume RESUME_DIR
+                        Resume an interrupted crawl from its output subdirectory
+  -i, --incremental     Revisit pages from earlier runs when due, using conditional requests
+  -c, --cluster         Share the frontier with other nodes through MongoDB
+  --node-id NODE_ID     Name of this node in cluster mode (default: <hostname>-<pid>)
+  -p PROXY, --proxy PROXY
+                        Tor SOCKS endpoint (repeatable, default: socks5://127.0.0.1:9050)
+  --metrics-port PORT   Serve Prometheus metrics on 127.0.0.1:PORT/metrics (0 disables)
+
+Reprocess a finished crawl offline:
+  nemesis reprocess OUTPUT_DIR [-k KEYWORD] [-K FILE] [-x REGEX] [--source archive|mongo] [-w WORKERS] [--no-mongo]
+                        Re-run link extraction and keyword matching over stored pages""")
 
 CONFIG = {
-    'TOR_PROXY': 'socks5://127.0.0.1:9050',
+    'TOR_PROXIES': ['socks5://127.0.0.1:9050'],
+    'TOR_ISOLATION_SLOTS': 4,
+    'TOR_EJECT_THRESHOLD': 3,
+    'TOR_EJECT_SECONDS': 60,
     'MONGO_URI': "mongodb://localhost:27017/",
     'DB_NAME': "dark_web_crawler",
     'COLLECTION_NAME': "crawler_page",
+    'BLOB_COLLECTION': "crawler_html",
+    'LINKS_COLLECTION': "crawler_links",
+    'BLOB_COMPRESS_LEVEL': 6,
+    'MONGO_BATCH_SIZE': 100,
+    'MONGO_FLUSH_INTERVAL': 2,
+    'MONGO_BUFFER_SIZE': 1000,
     'CONCURRENT_REQUESTS': 8,
     'MIN_CONCURRENT_REQUESTS': 2,
+    'MAX_CONCURRENT_REQUESTS': 32,
     'REQUEST_DELAY': 3,
+    'HOST_MAX_CONCURRENCY': 2,
+    'HOST_LOOKAHEAD_PER_WORKER': 4,
+    'HOST_BUFFER_MAX': 10000,
+    'KEEPALIVE_TIMEOUT': 60,
     'MAX_RAM_USAGE_PERCENT': 70,
     'MAX_CPU_USAGE_PERCENT': 80,
+    'RESOURCE_SAMPLE_INTERVAL': 2,
+    'CONTROL_INTERVAL': 5,
+    'TARGET_FETCH_LATENCY': 20,
+    'MAX_ERROR_RATE': 0.8,
+    'AIMD_INCREASE_STEP': 1,
+    'AIMD_DECREASE_FACTOR': 0.5,
+    'REQUEST_TIMEOUT': 30,
+    'FIRST_BYTE_TIMEOUT': 15,
+    'MAX_BODY_BYTES': 5 * 1024 * 1024,
+    'FETCH_CHUNK_SIZE': 64 * 1024,
+    'HOST_FAILURE_THRESHOLD': 2,
+    'HOST_BACKOFF_BASE': 60,
+    'HOST_BACKOFF_MAX': 3600,
+    'HOST_PROBE_TIMEOUT': 10,
+    'HOST_MAX_PROBES': 8,
+    'STREAM_LINK_EXTRACTION': False,
+    'PARSE_WORKERS': os.cpu_count() or 1,
+    'PARSE_QUEUE_DEPTH': 64,
+    'REPROCESS_CHUNK': 64,
+    'FAST_LINK_EXTRACTOR': True,
+    'FRONTIER_DB': 'frontier.db',
+    'CLUSTER_FRONTIER_COLLECTION': 'crawler_frontier',
+    'CLUSTER_NODES_COLLECTION': 'crawler_nodes',
+    'CLUSTER_SLOTS': 256,
+    'CLUSTER_LEASE_SECONDS': 120,
+    'CLUSTER_HEARTBEAT_INTERVAL': 10,
+    'CLUSTER_NODE_TIMEOUT': 30,
+    'CLUSTER_FLUSH_INTERVAL': 2,
+    'CLUSTER_CLAIM_BATCH': 8,
+    'CLUSTER_POLL_INTERVAL': 2,
+    'ARCHIVE_INDEX': 'index.db',
+    'DEDUP_ENABLED': True,
+    'DEDUP_MIN_TOKENS': 50,
+    'SIMHASH_MAX_DISTANCE': 3,
+    'STORE_DUPLICATE_HTML': False,
+    'REVISIT_INTERVAL': 24 * 3600,
+    'REVISIT_MIN_INTERVAL': 6 * 3600,
+    'REVISIT_MAX_INTERVAL': 30 * 24 * 3600,
+    'FINGERPRINT_FILE': 'fingerprints.tsv',
+    'ARCHIVE_SEGMENT_BYTES': 256 * 1024 * 1024,
+    'ARCHIVE_COMPRESS_LEVEL': 6,
+    'ARCHIVE_BATCH_SIZE': 50,
+    'ARCHIVE_FLUSH_INTERVAL': 2,
+    'ARCHIVE_BUFFER_SIZE': 200,
     'SKIP_EXTENSIONS': ['.mp4', '.mp3', '.avi', '.mkv', '.mov', '.jpg', '.png', '.gif', '.zip', '.rar', '.pdf'],
+    'SCHEDULER_TICK': 1,
+    'RESEED_BACKOFF': 5,
+    'JOURNAL_FLUSH_INTERVAL': 5,
+    'JOURNAL_BUFFER_BYTES': 64 * 1024,
+    'QUEUE_COMPACT_INTERVAL': 300,
+    'CHECKPOINT_INTERVAL': 120,
+    'CHECKPOINT_FILE': 'checkpoint.bin',
+    'METRICS_HOST': '127.0.0.1',
+    'METRICS_PORT': 9464,
+    'STATS_INTERVAL': 10,
+    'STATS_FILE': 'stats.json',
     'DEFAULT_TIME_LIMIT_MINUTES': 30,
     'MAX_URL_LENGTH': 80,
+    'STRIP_TRAILING_SLASH': True,
+    'SORT_QUERY_PARAMS': False,
     'DATA_DIR': 'data',
     'RAW_PAGES_DIR': 'data/raw_pages'
 }
@@ -101,8 +214,125 @@ SEED_URLS = [
     "http://kawbtpskqu7rr3t6ecz4fyutpzq7jtblin3wv5vamneryu4nwenhkgyd.onion/mediawiki/index.php?title=Tor",
 ]
 
-visited = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
-queue_filter = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
+# Leading bytes of common media and archive formats that servers mislabel as text/html
+BINARY_SIGNATURES = (
+    b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'%PDF', b'PK\x03\x04', b'Rar!', b'7z\xbc\xaf',
+    b'\x1f\x8b', b'ID3', b'OggS', b'RIFF', b'\x1a\x45\xdf\xa3'
+)
+
+class URLSet:
+    """Exact, compact URL set: interned hosts plus path records in a bytearray arena behind an open-addressing table"""
+    MAX_LOAD = 0.7
+    
+    def __init__(self, capacity=1 << 16):
+        self._hosts = {}
+        self._host_keys = []
+        self._arena = bytearray()
+        # Slot holds arena offset + 1 (0 marks an empty slot) and the high half of the key hash
+        self._offsets = array('Q', bytes(8 * capacity))
+        self._tags = array('I', bytes(4 * capacity))
+        self._count = 0
+    
+    @staticmethod
+    def _host_key(netloc):
+        # A v3 address is 56 base32 characters for 35 bytes of key, checksum and version
+        if netloc.endswith('.onion') and len(netloc) in (22, 62):
+            try:
+                return b'\x01' + base64.b32decode(netloc[:-6].upper())
+            except binascii.Error:
+                pass
+        return b'\x00' + netloc.encode('utf-8')
+    
+    def _key(self, url, intern=False):
+        parts = urlsplit(url)
+        host_key = self._host_key(parts.netloc)
+        host_id = self._hosts.get(host_key)
+        if host_id is None:
+            if not intern:
+                return None
+            host_id = self._hosts[host_key] = len(self._host_keys)
+            self._host_keys.append(host_key)
+        rest = parts.path + (f"?{parts.query}" if parts.query else "") + (f"#{parts.fragment}" if parts.fragment else "")
+        return struct.pack('<BI', parts.scheme == 'https', host_id) + rest.encode('utf-8')
+    
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+    
+    def _record(self, offset):
+        length = int.from_bytes(self._arena[offset:offset + 2], 'little')
+        return self._arena[offset + 2:offset + 2 + length]
+    
+    def _probe(self, key, key_hash):
+        mask, tag = len(self._offsets) - 1, key_hash >> 32
+        slot = key_hash & mask
+        while True:
+            offset = self._offsets[slot]
+            if not offset or (self._tags[slot] == tag and self._record(offset - 1) == key):
+                return slot
+            slot = (slot + 1) & mask
+    
+    def __contains__(self, url):
+        key = self._key(url)
+        return key is not None and bool(self._offsets[self._probe(key, self._hash(key))])
+    
+    def __len__(self):
+        return self._count
+    
+    def add(self, url):
+        """Add url and return True if it was already present, like ScalableBloomFilter.add"""
+        key = self._key(url, intern=True)
+        key_hash = self._hash(key)
+        slot = self._probe(key, key_hash)
+        if self._offsets[slot]:
+            return True
+        self._offsets[slot] = len(self._arena) + 1
+        self._tags[slot] = key_hash >> 32
+        self._arena += struct.pack('<H', len(key)) + key
+        self._count += 1
+        if self._count > len(self._offsets) * self.MAX_LOAD:
+            self._grow()
+        return False
+    
+    def _grow(self):
+        offsets = self._offsets
+        self._offsets = array('Q', bytes(8 * 2 * len(offsets)))
+        self._tags = array('I', bytes(4 * len(self._offsets)))
+        for offset in offsets:
+            if offset:
+                key = self._record(offset - 1)
+                key_hash = self._hash(key)
+                slot = self._probe(key, key_hash)
+                self._offsets[slot] = offset
+                self._tags[slot] = key_hash >> 32
+    
+    def tofile(self, f):
+        f.write(struct.pack('<QQQQ', self._count, len(self._offsets), len(self._arena), len(self._host_keys)))
+        for host_key in self._host_keys:
+            f.write(struct.pack('<H', len(host_key)) + host_key)
+        f.write(self._arena)
+        self._offsets.tofile(f)
+        self._tags.tofile(f)
+    
+    @classmethod
+    def fromfile(cls, f):
+        count, capacity, arena_length, host_count = struct.unpack('<QQQQ', f.read(32))
+        store = cls(capacity=1)
+        for _ in range(host_count):
+            length, = struct.unpack('<H', f.read(2))
+            host_key = f.read(length)
+            store._hosts[host_key] = len(store._host_keys)
+            store._host_keys.append(host_key)
+        store._arena = bytearray(f.read(arena_length))
+        store._offsets = array('Q')
+        store._offsets.fromfile(f, capacity)
+        store._tags = array('I')
+        store._tags.fromfile(f, capacity)
+        store._count = count
+        return store
+
+visited = URLSet()
+queue_filter = URLSet()
 time_limit_reached = False
 
 def signal_handler(sig, frame):
@@ -111,22 +341,176 @@ def signal_handler(sig, frame):
     time_limit_reached = True
     sys.exit(0)
 
+def request_shutdown():
+    # Installed on the event loop while crawling so workers stop and buffers get flushed
+    global time_limit_reached
+    logger.info("\nReceived shutdown signal. Saving progress and exiting...")
+    time_limit_reached = True
+
 signal.signal(signal.SIGINT, signal_handler)
 
+class Histogram:
+    """Fixed-bucket latency histogram in seconds, cheap enough to update on every call"""
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+    LABELS = [str(bound) for bound in BUCKETS] + ["+Inf"]
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus' histogram_quantile does
+        if not self.count:
+            return 0.0
+        target, seen, lower = q * self.count, 0, 0.0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return self.BUCKETS[-1]
+
+class Metrics:
+    """Process-wide counters, gauges and per-stage latency histograms, exported as Prometheus text and JSON"""
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters = Counter()
+        self.gauges = {}
+        self.stages = {}
+        self._runner = None
+        self._last_sample = (self.started, 0)
+    
+    def inc(self, name, value=1, **labels):
+        self.counters[(name, tuple(sorted(labels.items())))] += value
+    
+    def set(self, name, value):
+        self.gauges[name] = value
+    
+    def observe(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].observe(seconds)
+    
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+    
+    def total(self, name):
+        return sum(value for (counter, _), value in self.counters.items() if counter == name)
+    
+    @staticmethod
+    def _labels(labels):
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+    
+    def prometheus(self):
+        lines, typed = [], set()
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE nemesis_{name}_total counter")
+                typed.add(name)
+            lines.append(f"nemesis_{name}_total{self._labels(labels)} {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE nemesis_{name} gauge")
+            lines.append(f"nemesis_{name} {value}")
+        lines.append("# TYPE nemesis_stage_seconds histogram")
+        for stage, histogram in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, count in zip(Histogram.LABELS, histogram.counts):
+                cumulative += count
+                lines.append(f'nemesis_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'nemesis_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'nemesis_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self):
+        now = time.monotonic()
+        pages = self.total('pages')
+        # Recent rate covers the time since the previous snapshot, so it tracks slowdowns the lifetime rate hides
+        last_time, last_pages = self._last_sample
+        self._last_sample = (now, pages)
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'uptime_seconds': round(now - self.started, 1),
+            'pages_per_sec': round(pages / max(now - self.started, 1e-9), 3),
+            'recent_pages_per_sec': round((pages - last_pages) / max(now - last_time, 1e-9), 3),
+            'counters': {f"{name}{self._labels(labels)}": value for (name, labels), value in sorted(self.counters.items())},
+            'gauges': dict(self.gauges),
+            'stages': {
+                stage: {
+                    'count': histogram.count,
+                    'mean': round(histogram.sum / histogram.count, 4) if histogram.count else 0,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99)
+                }
+                for stage, histogram in sorted(self.stages.items())
+            }
+        }
+    
+    def write_stats(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+    
+    async def serve(self, host, port):
+        async def handle_metrics(request):
+            return web.Response(text=self.prometheus(), content_type='text/plain', charset='utf-8')
+        
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+    
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+metrics = Metrics()
+
 class ResourceManager:
     @staticmethod
-    def check_tor():
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            result = sock.connect_ex(('127.0.0.1', 9050))
-            sock.close()
-            if result != 0:
-                logger.error("Tor is not running on socks5://127.0.0.1:9050.")
-                sys.exit(1)
-        except Exception as e:
-            logger.error(f"Error checking Tor: {e}")
+    async def check_tor(proxies):
+        """Check every SOCKS endpoint in parallel and return the reachable ones"""
+        async def reachable(proxy):
+            parts = urlsplit(proxy)
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 9050), 2)
+            except Exception:
+                logger.warning(f"Tor is not running on {proxy}.")
+                return False
+            try:
+                if not parts.scheme.startswith('socks5'):
+                    return True
+                # A SOCKS5 greeting tells a listening Tor client apart from any other open port
+                writer.write(b'\x05\x02\x00\x02')
+                reply = await asyncio.wait_for(reader.readexactly(2), 2)
+                if reply[0] == 5 and reply[1] in (0, 2):
+                    return True
+                logger.warning(f"{proxy} is not a SOCKS5 proxy.")
+            except Exception as e:
+                logger.warning(f"Error checking Tor on {proxy}: {e!r}")
+            finally:
+                writer.close()
+            return False
+        
+        results = await asyncio.gather(*(reachable(proxy) for proxy in proxies))
+        live = [proxy for proxy, ok in zip(proxies, results) if ok]
+        if not live:
+            logger.error("Tor is not running on any configured SOCKS endpoint.")
             sys.exit(1)
+        return live
     
     @staticmethod
     def ensure_directories():
@@ -138,9 +522,9 @@ class ResourceManager:
         try:
             client = MongoClient(CONFIG['MONGO_URI'], serverSelectionTimeoutMS=5000)
             db = client[CONFIG['DB_NAME']]
-            collection = db[CONFIG['COLLECTION_NAME']]
-            collection.delete_many({})
-            logger.info("Cleared MongoDB collection.")
+            for name in (CONFIG['COLLECTION_NAME'], CONFIG['BLOB_COLLECTION'], CONFIG['LINKS_COLLECTION']):
+                db[name].delete_many({})
+            logger.info("Cleared MongoDB collections.")
         except Exception as e:
             logger.warning(f"Could not clear MongoDB: {e}")
         
@@ -171,6 +555,51 @@ class ResourceManager:
             except Exception as e:
                 logger.warning(f"Failed to clear crawler.log: {e}")
 
+class WriteBehind:
+    """Bounded buffer drained by one task that hands batches to a single writer thread"""
+    def __init__(self, write, batch_size, interval, buffer_size, name):
+        self.write = write
+        self.batch_size = batch_size
+        self.interval = interval
+        self._buffer = asyncio.Queue(maxsize=buffer_size)
+        # One thread keeps batches in order; owners may queue their own reads behind the writes on it
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._flusher = None
+    
+    def qsize(self):
+        return self._buffer.qsize()
+    
+    async def put(self, item):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+        # Blocks the caller when the buffer is full, so a slow store throttles the crawl instead of growing memory
+        await self._buffer.put(item)
+    
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._buffer.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(self._buffer.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    await loop.run_in_executor(self.executor, self.write, batch)
+                    return
+                batch.append(item)
+            await loop.run_in_executor(self.executor, self.write, batch)
+    
+    async def close(self):
+        if self._flusher is not None:
+            await self._buffer.put(None)
+            await self._flusher
+        self.executor.shutdown(wait=True)
+
 class MongoManager:
     def __init__(self):
         try:
@@ -178,53 +607,335 @@ class MongoManager:
             self.client.admin.command('ping')
             self.db = self.client[CONFIG['DB_NAME']]
             self.collection = self.db[CONFIG['COLLECTION_NAME']]
+            self.blobs = self.db[CONFIG['BLOB_COLLECTION']]
+            self.links = self.db[CONFIG['LINKS_COLLECTION']]
             self._create_indexes()
             logger.info("Connected to MongoDB successfully")
         except Exception as e:
             logger.warning(f"MongoDB connection failed ({e}).")
-            self.client = self.db = self.collection = None
+            self.client = self.db = self.collection = self.blobs = self.links = None
+        self._writer = WriteBehind(
+            self._bulk_write, CONFIG['MONGO_BATCH_SIZE'], CONFIG['MONGO_FLUSH_INTERVAL'], CONFIG['MONGO_BUFFER_SIZE'], 'mongo-writer'
+        )
     
     def _create_indexes(self):
         self.collection.create_index([("url", 1)], unique=True)
         self.collection.create_index([("timestamp", -1)])
         self.collection.create_index([("status", 1)])
+        self.collection.create_index([("keywords", 1)])
+        self.links.create_index([("src", 1)])
+        self.links.create_index([("dst", 1)])
     
-    async def save_page(self, url, status, links_found, html=None):
+    async def save_page(self, url, status, links_found, html=None, keyword_hits=None, duplicate_of=None, revisit=None):
         if self.collection is None or status != "success":
             return
         document = {
             "url": url,
             "status": status,
             "links_found": list(links_found),
+            "links_count": len(links_found),
             "timestamp": datetime.now(timezone.utc),
             "domain": urlparse(url).netloc
         }
         if html:
             document["html"] = html
+        if keyword_hits:
+            document["keywords"] = sorted(keyword_hits)
+            document["keyword_hits"] = keyword_hits
+        if duplicate_of:
+            document["duplicate_of"] = duplicate_of
+        if revisit:
+            document.update(revisit)
+        await self._enqueue(document)
+    
+    async def save_revisit(self, url, revisit):
+        # Unchanged pages only move their revisit schedule; the stored HTML and links stay as they are
+        if self.collection is not None:
+            await self._enqueue({"url": url, **revisit})
+    
+    async def links_found(self, url):
+        if self.collection is None:
+            return set()
         try:
-            self.collection.update_one({"url": url}, {"$set": document}, upsert=True)
+            return await asyncio.get_running_loop().run_in_executor(self._writer.executor, self._load_links, url)
         except Exception as e:
-            logger.error(f"Error saving to MongoDB: {e}")
+            logger.warning(f"Could not load stored links of {url}: {e}")
+            return set()
     
-    def close(self):
+    def _load_links(self, url):
+        links = {edge["dst"] for edge in self.links.find({"src": url}, {"dst": 1})}
+        if links:
+            return links
+        # Pages stored before the edges collection still carry their links inline
+        document = self.collection.find_one({"url": url}, {"links_found": 1})
+        return set(document.get("links_found", [])) if document else set()
+    
+    def load_html(self, html_hash):
+        blob = self.blobs.find_one({"_id": html_hash})
+        return zlib.decompress(blob["html"]).decode('utf-8') if blob else None
+    
+    async def _enqueue(self, document):
+        with metrics.timer('mongo_enqueue'):
+            await self._writer.put(document)
+        metrics.set('mongo_buffer', self._writer.qsize())
+    
+    def _bulk_write(self, batch):
+        # Later saves of the same URL win, and duplicate upserts in one unordered batch would race
+        latest = {}
+        for document in batch:
+            latest.setdefault(document["url"], {}).update(document)
+        pages, blobs, edges = [], {}, []
+        for url, document in latest.items():
+            # HTML and links live in their own collections so page documents stay small enough to keep in RAM
+            html = document.pop("html", None)
+            links = document.pop("links_found", None)
+            update = {"$set": document}
+            # html_hash is the blob key; content_hash belongs to the revisit state and may move on without a new blob
+            if html is not None:
+                body = html.encode('utf-8')
+                document["html_hash"] = hashlib.sha1(body).hexdigest()
+                document["html_size"] = len(body)
+                blobs[document["html_hash"]] = body
+            if links is not None:
+                update["$unset"] = {"html": "", "links_found": ""}
+                # A full save replaces the crawl results, so matches and a duplicate link the page no longer has must go
+                update["$unset"].update((field, "") for field in ("keywords", "keyword_hits", "duplicate_of") if field not in document)
+                if html is None:
+                    # A full save without HTML (a duplicate) must not keep pointing at an older version's blob
+                    update["$unset"].update(html_hash="", html_size="")
+                edges.append(DeleteMany({"src": url}))
+                edges.extend(InsertOne({"src": url, "dst": link}) for link in links)
+            pages.append(UpdateOne({"url": url}, update, upsert=True))
+        try:
+            with metrics.timer('mongo_write'):
+                if blobs:
+                    # Keyed by content hash, so identical pages are compressed and stored once
+                    self.blobs.bulk_write([
+                        UpdateOne({"_id": html_hash}, {"$setOnInsert": {
+                            "html": zlib.compress(body, CONFIG['BLOB_COMPRESS_LEVEL']), "size": len(body),
+                            "created": datetime.now(timezone.utc)
+                        }}, upsert=True)
+                        for html_hash, body in blobs.items()
+                    ], ordered=False)
+                # Ordered, so a page's old edges are always deleted before its new ones are inserted
+                if edges:
+                    self.links.bulk_write(edges, ordered=True)
+                self.collection.bulk_write(pages, ordered=False)
+            metrics.inc('mongo_documents', len(pages))
+        except Exception as e:
+            metrics.inc('mongo_errors')
+            logger.error(f"Error saving {len(pages)} pages to MongoDB: {e}")
+    
+    async def close(self):
+        await self._writer.close()
         if self.client:
             self.client.close()
 
+class PageArchive:
+    """Append-only gzip segments of page records, indexed by URL and content hash in SQLite"""
+    SEGMENT_PREFIX = 'segment-'
+    SEGMENT_SUFFIX = '.gz'
+    
+    def __init__(self, directory):
+        self.directory = directory
+        # Only the writer thread uses the connection after setup
+        self._index = sqlite3.connect(os.path.join(directory, CONFIG['ARCHIVE_INDEX']), isolation_level=None, check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT NOT NULL, sha1 TEXT NOT NULL, segment TEXT NOT NULL, offset INTEGER NOT NULL, "
+            "length INTEGER NOT NULL, timestamp TEXT NOT NULL)"
+        )
+        self._index.execute("CREATE INDEX IF NOT EXISTS pages_url ON pages (url)")
+        self._index.execute("CREATE INDEX IF NOT EXISTS pages_sha1 ON pages (sha1)")
+        # A resumed run starts a fresh segment rather than appending to one that may end mid-record
+        self._segment_number = max((int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]) for name in self.segments(directory)), default=0)
+        self._segment = None
+        self._segment_name = None
+        self._writer = WriteBehind(
+            self._write, CONFIG['ARCHIVE_BATCH_SIZE'], CONFIG['ARCHIVE_FLUSH_INTERVAL'], CONFIG['ARCHIVE_BUFFER_SIZE'], 'archive-writer'
+        )
+    
+    @staticmethod
+    def segments(directory):
+        return sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(PageArchive.SEGMENT_PREFIX) and name.endswith(PageArchive.SEGMENT_SUFFIX)
+        )
+    
+    async def save(self, url, html):
+        await self._writer.put((url, html, datetime.now(timezone.utc).isoformat()))
+    
+    def _rotate(self):
+        if self._segment:
+            self._segment.close()
+        self._segment_number += 1
+        self._segment_name = f"{self.SEGMENT_PREFIX}{self._segment_number:05d}{self.SEGMENT_SUFFIX}"
+        self._segment = open(os.path.join(self.directory, self._segment_name), 'ab')
+    
+    def _locate(self, sha1):
+        return self._index.execute("SELECT segment, offset, length FROM pages WHERE sha1 = ? LIMIT 1", (sha1,)).fetchone()
+    
+    def _write(self, batch):
+        with metrics.timer('archive_write'):
+            self._write_batch(batch)
+        metrics.set('archive_buffer', self._writer.qsize())
+    
+    def _write_batch(self, batch):
+        try:
+            rows, stored = [], {}
+            for url, html, timestamp in batch:
+                body = html.encode('utf-8')
+                sha1 = hashlib.sha1(body).hexdigest()
+                # Identical bodies are stored once and every URL serving them points at the same record
+                location = stored.get(sha1) or self._locate(sha1)
+                if location is None:
+                    if self._segment is None or self._segment.tell() >= CONFIG['ARCHIVE_SEGMENT_BYTES']:
+                        self._rotate()
+                    header = json.dumps({'url': url, 'sha1': sha1, 'timestamp': timestamp, 'length': len(body)}).encode('utf-8')
+                    # Each record is its own gzip member, so a single page can be read back from its offset
+                    record = gzip.compress(header + b'\n' + body + b'\n', compresslevel=CONFIG['ARCHIVE_COMPRESS_LEVEL'])
+                    location = (self._segment_name, self._segment.tell(), len(record))
+                    self._segment.write(record)
+                    metrics.inc('archive_bytes', len(record))
+                stored[sha1] = location
+                rows.append((url, sha1, *location, timestamp))
+            if self._segment:
+                self._segment.flush()
+            # Index rows are committed only after their records reach the segment file
+            self._index.execute("BEGIN")
+            self._index.executemany(
+                "INSERT INTO pages (url, sha1, segment, offset, length, timestamp) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._index.execute("COMMIT")
+        except Exception as e:
+            if self._index.in_transaction:
+                self._index.execute("ROLLBACK")
+            logger.error(f"Error archiving {len(batch)} pages: {e}")
+    
+    @staticmethod
+    def read(directory, segment, offset, length):
+        return next(PageArchive.read_many(directory, [(segment, offset, length)]))
+    
+    @staticmethod
+    def read_many(directory, locations):
+        """Yield (header, html) for (segment, offset, length) locations, keeping a segment open across neighbours"""
+        f, current = None, None
+        try:
+            for segment, offset, length in locations:
+                if segment != current:
+                    if f:
+                        f.close()
+                    f, current = open(os.path.join(directory, segment), 'rb'), segment
+                f.seek(offset)
+                header, body = gzip.decompress(f.read(length)).split(b'\n', 1)
+                yield json.loads(header), body[:-1].decode('utf-8')
+        finally:
+            if f:
+                f.close()
+    
+    @staticmethod
+    def iter_segment(path):
+        """Stream (header, html) records from a segment without decompressing it whole"""
+        with gzip.open(path, 'rb') as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                header = json.loads(line)
+                body = f.read(header['length'])
+                f.read(1)
+                yield header, body.decode('utf-8')
+    
+    async def close(self):
+        await self._writer.close()
+        if self._segment:
+            self._segment.close()
+        self._index.close()
+
+class AppendLog:
+    """Buffered append-only numbered log that keeps its line count in memory"""
+    def __init__(self, path):
+        self.path = path
+        self.count = self._count_lines()
+        self._file = self._open()
+    
+    def _open(self):
+        return open(self.path, 'a', encoding='utf-8', buffering=CONFIG['JOURNAL_BUFFER_BYTES'])
+    
+    def _count_lines(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    
+    def append(self, entry):
+        self.count += 1
+        self._file.write(f"{self.count}. {entry}\n")
+    
+    def rewrite(self, entries):
+        tmp_path = f"{self.path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8', buffering=CONFIG['JOURNAL_BUFFER_BYTES']) as f:
+            for count, entry in enumerate(entries, 1):
+                f.write(f"{count}. {entry}\n")
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self.count = count
+        self._file = self._open()
+    
+    def flush(self):
+        self._file.flush()
+    
+    def tell(self):
+        self._file.flush()
+        return self._file.tell()
+    
+    def close(self):
+        self._file.close()
+
+_journals = {}
+
 class URLManager:
     @staticmethod
-    def load_queue():
+    def journal(filename):
+        path = os.path.join(CONFIG['DATA_DIR'], filename)
+        if path not in _journals:
+            _journals[path] = AppendLog(path)
+        return _journals[path]
+    
+    @staticmethod
+    def flush_journals():
+        with metrics.timer('journal_flush'):
+            for log in _journals.values():
+                log.flush()
+    
+    @staticmethod
+    def close_journals():
+        for log in _journals.values():
+            log.close()
+        _journals.clear()
+    
+    @staticmethod
+    def load_queue(offset=0):
         path = os.path.join(CONFIG['DATA_DIR'], 'queue.txt')
         if not os.path.exists(path):
             return []
+        # Between compactions queue.txt is an append log, so it may hold duplicates and already visited URLs
         with open(path, 'r', encoding='utf-8') as f:
-            return [line.strip().split('. ', 1)[1] for line in f if line.strip()]
+            # An offset past the end belongs to a file that was compacted after the checkpoint took it
+            if offset <= os.fstat(f.fileno()).st_size:
+                f.seek(offset)
+            return list(dict.fromkeys(line.strip().split('. ', 1)[1] for line in f if '. ' in line))
+    
+    @staticmethod
+    def append_queue(url):
+        URLManager.journal('queue.txt').append(url)
     
     @staticmethod
     def save_queue(queue):
-        path = os.path.join(CONFIG['DATA_DIR'], 'queue.txt')
-        with open(path, 'w', encoding='utf-8') as f:
-            for i, url in enumerate(queue, 1):
-                f.write(f"{i}. {url}\n")
+        with metrics.timer('queue_compact'):
+            URLManager.journal('queue.txt').rewrite(queue)
     
     @staticmethod
     def load_visited():
@@ -232,19 +943,231 @@ class URLManager:
         if not os.path.exists(path):
             return set()
         with open(path, 'r', encoding='utf-8') as f:
-            return {line.split('. ', 1)[1].strip() for line in f if line.strip()}
+            return {line.split('. ', 1)[1].strip() for line in f if '. ' in line}
     
     @staticmethod
     def save_visited(url):
-        path = os.path.join(CONFIG['DATA_DIR'], 'visited_links.txt')
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                existing_lines = f.readlines()
-            new_number = len(existing_lines) + 1
-        else:
-            new_number = 1
-        with open(path, 'a', encoding='utf-8') as f:
-            f.write(f"{new_number}. {url}\n")
+        URLManager.journal('visited_links.txt').append(url)
+
+class CheckpointManager:
+    """Snapshot of the visited and queued URL sets and crawl counters, written with an atomic rename"""
+    MAGIC = b'NEMCKPT2'
+    
+    @staticmethod
+    def path():
+        return os.path.join(CONFIG['DATA_DIR'], CONFIG['CHECKPOINT_FILE'])
+    
+    @staticmethod
+    def save(meta):
+        path = CheckpointManager.path()
+        tmp_path = f"{path}.tmp"
+        payload = json.dumps(meta).encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(CheckpointManager.MAGIC)
+            f.write(struct.pack('<I', len(payload)))
+            f.write(payload)
+            visited.tofile(f)
+            queue_filter.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _read_meta(f):
+        if f.read(len(CheckpointManager.MAGIC)) != CheckpointManager.MAGIC:
+            raise ValueError("not a Nemesis checkpoint")
+        meta_length, = struct.unpack('<I', f.read(4))
+        return json.loads(f.read(meta_length).decode('utf-8'))
+    
+    @staticmethod
+    def load_meta():
+        """Read only the metadata, without restoring the URL sets"""
+        path = CheckpointManager.path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return CheckpointManager._read_meta(f)
+        except Exception as e:
+            logger.warning(f"Could not load checkpoint {path}: {e}")
+            return None
+    
+    @staticmethod
+    def load():
+        global visited, queue_filter
+        path = CheckpointManager.path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                meta = CheckpointManager._read_meta(f)
+                restored_visited = URLSet.fromfile(f)
+                restored_queue_filter = URLSet.fromfile(f)
+        except Exception as e:
+            logger.warning(f"Could not load checkpoint {path}: {e}")
+            return None
+        visited, queue_filter = restored_visited, restored_queue_filter
+        # Pages visited after the snapshot are only in the journal, so replay its tail
+        visited_path = os.path.join(CONFIG['DATA_DIR'], 'visited_links.txt')
+        if os.path.exists(visited_path):
+            with open(visited_path, 'r', encoding='utf-8') as f:
+                f.seek(meta.get('visited_offset', 0))
+                for line in f:
+                    if '. ' in line:
+                        visited.add(line.split('. ', 1)[1].strip())
+        return meta
+
+def fingerprint(text):
+    """Exact hash and 64-bit SimHash over word 3-shingles, or None when the text is too short to compare"""
+    tokens = text.lower().split()
+    if len(tokens) < CONFIG['DEDUP_MIN_TOKENS']:
+        return None
+    content_hash = hashlib.sha1(" ".join(tokens).encode('utf-8')).hexdigest()
+    # blake2b instead of hash(), which is salted per process and would differ between parse workers and runs
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for shingle in {" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+    ]
+    half = len(hashes) / 2
+    # Column counts over fixed-width bit strings run in C instead of 64 Python passes over the hashes
+    bits = "".join(f"{h:064b}" for h in hashes)
+    simhash = 0
+    for column in range(64):
+        if bits[column::64].count('1') > half:
+            simhash |= 1 << (63 - column)
+    return content_hash, simhash
+
+class DuplicateIndex:
+    """Exact-hash map plus a banded SimHash LSH index; persisted as an append-only fingerprints file"""
+    def __init__(self, max_distance=None):
+        self.max_distance = CONFIG['SIMHASH_MAX_DISTANCE'] if max_distance is None else max_distance
+        # With max_distance + 1 bands, any two fingerprints within max_distance bits agree exactly on one band
+        self.bands = self.max_distance + 1
+        self._width = 64 // self.bands
+        self._exact = {}
+        self._buckets = [{} for _ in range(self.bands)]
+        self._file = None
+    
+    def _keys(self, simhash):
+        mask = (1 << self._width) - 1
+        return [(simhash >> (band * self._width)) & mask for band in range(self.bands)]
+    
+    def find(self, content_hash, simhash):
+        canonical = self._exact.get(content_hash)
+        if canonical:
+            return canonical
+        for bucket, key in zip(self._buckets, self._keys(simhash)):
+            for other, url in bucket.get(key, ()):
+                if bin(other ^ simhash).count('1') <= self.max_distance:
+                    return url
+        return None
+    
+    def add(self, url, content_hash, simhash):
+        self._exact[content_hash] = url
+        for bucket, key in zip(self._buckets, self._keys(simhash)):
+            bucket.setdefault(key, []).append((simhash, url))
+        if self._file:
+            self._file.write(f"{content_hash}\t{simhash:016x}\t{url}\n")
+    
+    def check(self, url, page_fingerprint):
+        """Return the canonical URL this page duplicates, or register it as a new canonical page"""
+        content_hash, simhash = page_fingerprint
+        canonical = self.find(content_hash, simhash)
+        if canonical is None:
+            self.add(url, content_hash, simhash)
+        elif self._file:
+            # Duplicates get a fourth column naming their canonical page, so reprocessing can hand them its keyword hits
+            self._file.write(f"{content_hash}\t{simhash:016x}\t{url}\t{canonical}\n")
+        return canonical
+    
+    @staticmethod
+    def read(path):
+        """Yield (content_hash, simhash, url, canonical) per fingerprints file line; canonical is None for canonical pages"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) in (3, 4):
+                    yield parts[0], int(parts[1], 16), parts[2], parts[3] if len(parts) == 4 else None
+    
+    def open(self, path):
+        for content_hash, simhash, url, canonical in self.read(path):
+            if canonical is None:
+                self.add(url, content_hash, simhash)
+        self._file = open(path, 'a', encoding='utf-8', buffering=CONFIG['JOURNAL_BUFFER_BYTES'])
+    
+    def flush(self):
+        if self._file:
+            self._file.flush()
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+fingerprints = DuplicateIndex()
+
+class RevisitTracker:
+    """Validators and adaptive revisit intervals for pages stored by earlier runs"""
+    FIELDS = ('etag', 'last_modified', 'content_hash', 'revisit_interval')
+    
+    def __init__(self):
+        self.known = {}
+    
+    def load(self, collection):
+        """Return the stored URLs that are due for a revisit and those that are still fresh"""
+        now = datetime.now(timezone.utc)
+        due, fresh = [], []
+        projection = dict.fromkeys(('url', 'next_visit') + self.FIELDS, 1)
+        for document in collection.find({"status": "success"}, projection):
+            url = CrawlerUtils.canonicalize(document["url"])
+            next_visit = document.get("next_visit")
+            # pymongo hands back naive UTC datetimes unless the client is tz_aware
+            if next_visit is not None and next_visit.replace(tzinfo=timezone.utc) > now:
+                fresh.append(url)
+            else:
+                self.known[url] = {field: document.get(field) for field in self.FIELDS}
+                due.append(url)
+        return due, fresh
+    
+    def headers(self, url):
+        state = self.known.get(url)
+        if not state:
+            return HEADERS
+        headers = dict(HEADERS)
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+    
+    def unchanged(self, url, content_hash):
+        state = self.known.get(url)
+        return state is not None and state['content_hash'] == content_hash
+    
+    def update(self, url, response, content_hash=None):
+        """Revisit fields for a fetched page; the interval halves when the page changed and doubles when it did not"""
+        previous = self.known.pop(url, None) or {}
+        now = datetime.now(timezone.utc)
+        changed = content_hash is not None and content_hash != previous.get('content_hash')
+        interval = previous.get('revisit_interval') or CONFIG['REVISIT_INTERVAL']
+        if previous:
+            interval = interval / 2 if changed else interval * 2
+        interval = min(max(interval, CONFIG['REVISIT_MIN_INTERVAL']), CONFIG['REVISIT_MAX_INTERVAL'])
+        revisit = {
+            'etag': response.headers.get('ETag') or previous.get('etag'),
+            'last_modified': response.headers.get('Last-Modified') or previous.get('last_modified'),
+            'fetched_at': now,
+            'revisit_interval': interval,
+            'next_visit': now + timedelta(seconds=interval)
+        }
+        if changed:
+            revisit['content_hash'] = content_hash
+            revisit['changed_at'] = now
+        return revisit
+
+revisits = RevisitTracker()
 
 class CrawlerUtils:
     @staticmethod
@@ -252,33 +1175,52 @@ class CrawlerUtils:
         pattern = re.compile(r'^https?://[a-z2-7]{16,56}\.onion(/.*)?$', re.IGNORECASE)
         return bool(pattern.match(url)) and len(url) <= CONFIG['MAX_URL_LENGTH']
     
+    @staticmethod
+    def canonicalize(url):
+        """Lower-case scheme and host, drop fragment, userinfo and default port, normalize the trailing slash"""
+        try:
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            host = (parts.hostname or '').lower()
+            port = parts.port
+        except ValueError:
+            return url
+        netloc = host if port is None or port == {'http': 80, 'https': 443}.get(scheme) else f"{host}:{port}"
+        path = parts.path or '/'
+        if CONFIG['STRIP_TRAILING_SLASH'] and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        query = parts.query
+        if CONFIG['SORT_QUERY_PARAMS'] and query:
+            # Raw pairs are sorted as-is so no parameter is re-encoded differently
+            query = '&'.join(sorted(query.split('&')))
+        return urlunsplit((scheme, netloc, path, query, ''))
+    
     @staticmethod
     def is_skippable(url):
         return not CrawlerUtils.is_valid_onion_url(url) or any(url.lower().endswith(ext) for ext in CONFIG['SKIP_EXTENSIONS'])
     
     @staticmethod
-    def save_html_to_file(url, html):
-        try:
-            domain = urlparse(url).netloc
-            filename = f"{domain}{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.html"
-            path = os.path.join(CONFIG['RAW_PAGES_DIR'], filename)
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(html)
-        except Exception as e:
-            tqdm.write(f'Error saving HTML for {url}: {e}')
+    def classify_error(e):
+        # SOCKS timeouts are TimeoutError subclasses too, so proxy failures are checked first
+        if isinstance(e, (ProxyError, ProxyConnectionError, ProxyTimeoutError)):
+            return 'socks'
+        if isinstance(e, asyncio.TimeoutError):
+            return 'timeout'
+        if isinstance(e, aiohttp.ClientConnectorError):
+            return 'connect'
+        if isinstance(e, aiohttp.ClientError):
+            return 'client'
+        return 'other'
+    
+    @staticmethod
+    def is_binary(chunk):
+        # MP4/MOV put their 'ftyp' box tag after a 4-byte length
+        return chunk.startswith(BINARY_SIGNATURES) or chunk[4:8] == b'ftyp' or b'\x00' in chunk[:512]
     
     @staticmethod
-    def save_keyword_url(url, keyword):
+    def save_keyword_url(url, hits):
         try:
-            path = os.path.join(CONFIG['DATA_DIR'], 'keyword_matches.txt')
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                number = len(lines) + 1
-            else:
-                number = 1
-            with open(path, 'a', encoding='utf-8') as f:
-                f.write(f"{number}. {url} (Keyword: {keyword})\n")
+            URLManager.journal('keyword_matches.txt').append(f"{url} (Keywords: {KeywordMatcher.format_hits(hits)})")
         except Exception as e:
             tqdm.write(f"Error saving keyword URL {url}: {e}")
     
@@ -287,102 +1229,1502 @@ class CrawlerUtils:
         if not html or not keyword:
             return False
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            elements = ['title', 'meta', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'div', 'a']
-            text_sources = []
-            for tag in elements:
-                if tag == 'meta':
-                    text_sources.extend(meta.get('content', '').lower() for meta in soup.find_all('meta') if meta.get('content'))
-                else:
-                    text_sources.extend(t.get_text(strip=True).lower() for t in soup.find_all(tag) if t.get_text(strip=True))
-            return keyword.lower().strip() in " ".join(text_sources)
+            return bool(KeywordMatcher([keyword]).match(page_text(BeautifulSoup(html, 'html.parser'))))
         except Exception as e:
             tqdm.write(f"Error checking keyword in page: {e}")
             return False
     
     @staticmethod
-    async def check_system_resources():
-        mem = psutil.virtual_memory().percent
-        cpu = psutil.cpu_percent(interval=1)
-        if mem > CONFIG['MAX_RAM_USAGE_PERCENT'] or cpu > CONFIG['MAX_CPU_USAGE_PERCENT']:
-            overload = max(mem - CONFIG['MAX_RAM_USAGE_PERCENT'], cpu - CONFIG['MAX_CPU_USAGE_PERCENT']) / 100
-            concurrency = max(CONFIG['MIN_CONCURRENT_REQUESTS'], int(CONFIG['CONCURRENT_REQUESTS'] * (1 - overload)))
-            delay = CONFIG['REQUEST_DELAY'] * (1 + overload)
-            tqdm.write(f"System overload (CPU: {cpu}%, RAM: {mem}%). Adjusting to {concurrency} concurrent requests, {delay:.1f}s delay")
-            return concurrency, delay
-        return CONFIG['CONCURRENT_REQUESTS'], CONFIG['REQUEST_DELAY']
+    def resolve_onion_link(href, base_url):
+        if '.onion' in href and len(href) <= CONFIG['MAX_URL_LENGTH']:
+            full_url = urljoin(base_url, href) if not href.startswith('http') else href
+            if CrawlerUtils.is_valid_onion_url(full_url):
+                return CrawlerUtils.canonicalize(full_url)
+        return None
     
     @staticmethod
-    def extract_onion_links(html, base_url):
-        soup = BeautifulSoup(html, 'html.parser')
+    def filter_onion_links(hrefs, base_url):
         found_links = set()
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if '.onion' in href and len(href) <= CONFIG['MAX_URL_LENGTH']:
-                full_url = urljoin(base_url, href) if not href.startswith('http') else href
-                if CrawlerUtils.is_valid_onion_url(full_url):
-                    found_links.add(full_url)
+        for href in hrefs:
+            full_url = CrawlerUtils.resolve_onion_link(href, base_url)
+            if full_url:
+                found_links.add(full_url)
         return found_links
+    
+    @staticmethod
+    def extract_onion_links(html, base_url):
+        soup = BeautifulSoup(html, 'html.parser')
+        return CrawlerUtils.filter_onion_links((link['href'] for link in soup.find_all('a', href=True)), base_url)
+
+class AhoCorasick:
+    """Pure-Python multi-pattern automaton; iter() yields the index of every pattern occurrence in one pass"""
+    def __init__(self, patterns):
+        self.goto, self.fail, self.out = [{}], [0], [[]]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(index)
+        # Breadth-first so every failure link points at an already finished shallower node
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, nxt in self.goto[node].items():
+                pending.append(nxt)
+                fail = self.fail[node]
+                while fail and ch not in self.goto[fail]:
+                    fail = self.fail[fail]
+                target = self.goto[fail].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+    
+    def iter(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            yield from out[node]
+
+class KeywordMatcher:
+    """Case-insensitive matching of many keywords and regexes against a page's text in a single scan"""
+    REGEX_PREFIX = 're:'
+    
+    def __init__(self, keywords=(), regexes=()):
+        self.keywords = list(dict.fromkeys(k.lower().strip() for k in keywords if k and k.strip()))
+        self.regexes = list(dict.fromkeys(r for r in regexes if r))
+        self._patterns = [re.compile(r, re.IGNORECASE) for r in self.regexes]
+        if AHOCORASICK_AVAILABLE and self.keywords:
+            self._automaton = ahocorasick.Automaton()
+            for index, keyword in enumerate(self.keywords):
+                self._automaton.add_word(keyword, index)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = AhoCorasick(self.keywords)
+    
+    @classmethod
+    def from_args(cls, keywords=None, keywords_file=None, regexes=None):
+        keywords, regexes = list(keywords or []), list(regexes or [])
+        if keywords_file:
+            with open(keywords_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if line.startswith(cls.REGEX_PREFIX):
+                        regexes.append(line[len(cls.REGEX_PREFIX):])
+                    else:
+                        keywords.append(line)
+        matcher = cls(keywords, regexes)
+        return matcher if matcher else None
+    
+    def __bool__(self):
+        return bool(self.keywords or self.regexes)
+    
+    def __str__(self):
+        return ", ".join(self.keywords + [f"{self.REGEX_PREFIX}{r}" for r in self.regexes])
+    
+    @property
+    def label(self):
+        # Names the output subdirectory, so regexes are left out
+        return self.keywords[0] if self.keywords else "keywords"
+    
+    def match(self, text):
+        """Return {term: occurrence count} for every keyword and regex found in text"""
+        hits = Counter()
+        lowered = text.lower()
+        if self.keywords:
+            if AHOCORASICK_AVAILABLE:
+                indices = (index for _, index in self._automaton.iter(lowered))
+            else:
+                indices = self._automaton.iter(lowered)
+            hits.update(self.keywords[index] for index in indices)
+        for regex, pattern in zip(self.regexes, self._patterns):
+            count = sum(1 for _ in pattern.finditer(text))
+            if count:
+                hits[f"{self.REGEX_PREFIX}{regex}"] = count
+        return dict(hits)
+    
+    @staticmethod
+    def format_hits(hits):
+        return ", ".join(f"{term} x{count}" for term, count in sorted(hits.items(), key=lambda hit: -hit[1]))
+
+class FastLinkExtractor(HTMLParser):
+    """Stdlib tokenizer that only collects anchor hrefs, skipping tree construction"""
+    def __init__(self, collect_text=False):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+        self.collect_text = collect_text
+        self._text = []
+        self._skip = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            for name, value in attrs:
+                if name == 'href' and value:
+                    self.hrefs.append(value)
+        elif tag in ('script', 'style'):
+            self._skip += 1
+    
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip:
+            self._skip -= 1
+    
+    def handle_data(self, data):
+        if self.collect_text and not self._skip:
+            self._text.append(data)
+    
+    def page(self, base_url):
+        self.close()
+        links = CrawlerUtils.filter_onion_links(self.hrefs, base_url)
+        text = " ".join(" ".join(self._text).split())
+        # SimHash is left to the caller, which may be running on the event loop
+        return {'links': links, 'anchors': {}, 'title': '', 'meta': [], 'text': text, 'keyword_hits': {}, 'fingerprint': None}
+
+class FetchAborted(Exception):
+    pass
+
+def page_text(soup, meta=None):
+    """Visible text of a parsed page plus its meta contents, built from a single get_text() over the tree"""
+    if meta is None:
+        meta = [tag['content'] for tag in soup.find_all('meta', content=True)]
+    for tag in soup(['script', 'style']):
+        tag.decompose()
+    return " ".join(soup.get_text().split() + meta)
+
+def parse_page(html, base_url, matcher=None, links_only=False):
+    """Parse a page once and return its links, visible text, metadata and keyword hits"""
+    if links_only:
+        extractor = FastLinkExtractor(collect_text=CONFIG['DEDUP_ENABLED'])
+        extractor.feed(html)
+        page = extractor.page(base_url)
+        page['fingerprint'] = fingerprint(page['text']) if CONFIG['DEDUP_ENABLED'] else None
+        return page
+    soup = BeautifulSoup(html, 'html.parser')
+    links, anchors = set(), {}
+    for tag in soup.find_all('a', href=True):
+        full_url = CrawlerUtils.resolve_onion_link(tag['href'], base_url)
+        if full_url:
+            links.add(full_url)
+            if matcher:
+                anchors[full_url] = f"{anchors.get(full_url, '')} {tag.get_text(' ', strip=True)}".strip()
+    title = soup.title.get_text(strip=True) if soup.title else ''
+    meta = [tag['content'] for tag in soup.find_all('meta', content=True)]
+    text = page_text(soup, meta)
+    keyword_hits = matcher.match(text) if matcher else {}
+    page_fingerprint = fingerprint(text) if CONFIG['DEDUP_ENABLED'] else None
+    return {'links': links, 'anchors': anchors, 'title': title, 'meta': meta, 'text': text,
+            'keyword_hits': keyword_hits, 'fingerprint': page_fingerprint}
+
+_worker_matcher = None
+
+def _init_parse_worker(matcher):
+    # Parse workers leave SIGINT to the crawler process, which shuts the pool down itself
+    global _worker_matcher
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The matcher is shipped once per worker instead of being pickled with every page
+    _worker_matcher = matcher
+
+def _parse_in_worker(html, base_url, links_only):
+    return parse_page(html, base_url, _worker_matcher, links_only)
+
+class ParsePool:
+    def __init__(self, workers=None, depth=None, matcher=None):
+        workers = CONFIG['PARSE_WORKERS'] if workers is None else workers
+        self.matcher = matcher
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker, initargs=(matcher,)) if workers > 0 else None
+        self._slots = asyncio.Semaphore(depth or CONFIG['PARSE_QUEUE_DEPTH'])
+    
+    async def parse(self, html, base_url):
+        links_only = not self.matcher and CONFIG['FAST_LINK_EXTRACTOR']
+        if self.executor is None:
+            return await self._run('parse', parse_page, html, base_url, self.matcher, links_only)
+        return await self._run('parse', _parse_in_worker, html, base_url, links_only)
+    
+    async def fingerprint(self, text):
+        """SimHash of text that was already extracted on the event loop"""
+        return await self._run('fingerprint', fingerprint, text)
+    
+    async def _run(self, stage, function, *args):
+        # Bounded in-flight parses give backpressure to the fetch workers when the pool is saturated
+        with metrics.timer('parse_wait'):
+            await self._slots.acquire()
+        try:
+            with metrics.timer(stage):
+                if self.executor is None:
+                    return function(*args)
+                return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        # Parses still queued were cancelled with the fetch workers awaiting them; cancel_futures would need Python 3.9
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+def _init_reprocess_worker(matcher):
+    _init_parse_worker(matcher)
+    # Reprocessing only refreshes links and keyword hits, so skip the SimHash work in parse_page
+    CONFIG['DEDUP_ENABLED'] = False
+
+def _reprocess_page(html, base_url, urls):
+    page = parse_page(html, base_url, _worker_matcher, links_only=not _worker_matcher and CONFIG['FAST_LINK_EXTRACTOR'])
+    return base_url, urls, sorted(page['links']), page['keyword_hits']
+
+def _reprocess_archive_chunk(directory, chunk):
+    records = PageArchive.read_many(directory, [location for location, _ in chunk])
+    return [_reprocess_page(html, header['url'], urls) for (header, html), (_, urls) in zip(records, chunk)]
+
+def _reprocess_blob_chunk(chunk):
+    # Blobs stay compressed on their way to the worker; pages from the old layout arrive as inline text
+    return [_reprocess_page(zlib.decompress(html).decode('utf-8') if isinstance(html, bytes) else html, url, [url]) for url, html in chunk]
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+class Reprocessor:
+    """Re-runs link extraction and keyword matching over stored pages across a process pool, without the network"""
+    MONGO_QUERY = {"$or": [{"html_hash": {"$exists": True}}, {"html": {"$exists": True}}]}
+    
+    def __init__(self, directory, matcher=None, workers=None, mongo=True):
+        self.directory = directory
+        self.raw_pages = os.path.join(directory, 'raw_pages')
+        self.matcher = matcher
+        self.workers = workers or CONFIG['PARSE_WORKERS']
+        self.matches = []
+        self.pages = 0
+        self.duplicates = 0
+        self.duplicate_of = {}
+        self._canonicals = set()
+        self._canonical_hits = {}
+        self.client = self.collection = self.blobs = self.links = None
+        if mongo:
+            try:
+                self.client = MongoClient(CONFIG['MONGO_URI'], serverSelectionTimeoutMS=5000)
+                self.client.admin.command('ping')
+                db = self.client[CONFIG['DB_NAME']]
+                self.collection = db[CONFIG['COLLECTION_NAME']]
+                self.blobs = db[CONFIG['BLOB_COLLECTION']]
+                self.links = db[CONFIG['LINKS_COLLECTION']]
+            except Exception as e:
+                logger.warning(f"MongoDB connection failed ({e}); only keyword_matches.txt will be updated.")
+                self.client = None
+    
+    def load_duplicates(self):
+        """Map each duplicate that was recorded without its HTML to its canonical page"""
+        for _, _, url, canonical in DuplicateIndex.read(os.path.join(self.directory, CONFIG['FINGERPRINT_FILE'])):
+            if canonical:
+                self.duplicate_of[url] = canonical
+        # Other cluster nodes' duplicates are only in MongoDB
+        if self.collection is not None:
+            for document in self.collection.find({"duplicate_of": {"$exists": True}}, {"url": 1, "duplicate_of": 1}):
+                self.duplicate_of[document["url"]] = document["duplicate_of"]
+        self._canonicals = set(self.duplicate_of.values())
+    
+    def archive_tasks(self):
+        index = sqlite3.connect(os.path.join(self.raw_pages, CONFIG['ARCHIVE_INDEX']))
+        try:
+            total = index.execute("SELECT COUNT(*) FROM (SELECT DISTINCT segment, offset FROM pages)").fetchone()[0]
+            yield total
+            # Reading in file order keeps disk access sequential; every URL that shares a record is matched together
+            rows = index.execute("SELECT segment, offset, length, url FROM pages ORDER BY segment, offset")
+            records = ((location, [row[3] for row in group]) for location, group in itertools.groupby(rows, key=lambda row: row[:3]))
+            for chunk in _chunks(records, CONFIG['REPROCESS_CHUNK']):
+                yield _reprocess_archive_chunk, (self.raw_pages, chunk)
+        finally:
+            index.close()
+    
+    def mongo_tasks(self):
+        yield self.collection.count_documents(self.MONGO_QUERY)
+        cursor = self.collection.find(self.MONGO_QUERY, {"url": 1, "html_hash": 1, "html": 1})
+        for documents in _chunks(cursor, CONFIG['REPROCESS_CHUNK']):
+            hashes = [document["html_hash"] for document in documents if "html" not in document]
+            blobs = {blob["_id"]: blob["html"] for blob in self.blobs.find({"_id": {"$in": hashes}})}
+            chunk = [(document["url"], document.get("html") or blobs.get(document.get("html_hash"))) for document in documents]
+            yield _reprocess_blob_chunk, ([(url, html) for url, html in chunk if html],)
+    
+    def run(self, source='archive'):
+        self.load_duplicates()
+        tasks = self.archive_tasks() if source == 'archive' else self.mongo_tasks()
+        total = next(tasks)
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_reprocess_worker, initargs=(self.matcher,))
+        progress = tqdm(total=total, desc="Reprocessing", unit="page")
+        pending = set()
+        try:
+            for function, args in tasks:
+                # A bounded window of chunks streams the store through the pool instead of loading it all at once
+                if len(pending) >= 2 * self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._apply(future.result(), progress)
+                pending.add(pool.submit(function, *args))
+            for future in as_completed(pending):
+                self._apply(future.result(), progress)
+        finally:
+            progress.close()
+            # Cancelled by hand rather than with shutdown(cancel_futures=True), which needs Python 3.9
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+        # Duplicates without stored HTML take the hits of the page they duplicate; their own links were never expanded
+        carried = [(canonical, [url], [], self._canonical_hits[canonical])
+                   for url, canonical in self.duplicate_of.items() if canonical in self._canonical_hits]
+        for chunk in _chunks(carried, CONFIG['REPROCESS_CHUNK']):
+            self._store(chunk)
+        self.duplicates = len(carried)
+        if self.matcher:
+            log = AppendLog(os.path.join(self.directory, 'keyword_matches.txt'))
+            log.rewrite(self.matches)
+            log.close()
+    
+    def _apply(self, results, progress):
+        for _, urls, _, hits in results:
+            for url in urls:
+                # Duplicates stored anyway (STORE_DUPLICATE_HTML) were just matched on their own HTML
+                self.duplicate_of.pop(url, None)
+                if url in self._canonicals:
+                    self._canonical_hits[url] = hits
+        self.pages += len(results)
+        progress.update(len(results))
+        self._store(results)
+    
+    def _store(self, results):
+        now = datetime.now(timezone.utc)
+        pages, edges = [], []
+        for base_url, urls, links, hits in results:
+            for url in urls:
+                update = {"$set": {"reprocessed_at": now}}
+                if self.matcher and hits:
+                    self.matches.append(f"{url} (Keywords: {KeywordMatcher.format_hits(hits)})")
+                    update["$set"].update(keywords=sorted(hits), keyword_hits=hits)
+                elif self.matcher:
+                    update["$unset"] = {"keywords": "", "keyword_hits": ""}
+                # Relative links were resolved against the record's own URL, so only that page gets the edges
+                if url == base_url:
+                    update["$set"]["links_count"] = len(links)
+                    edges.append(DeleteMany({"src": url}))
+                    edges.extend(InsertOne({"src": url, "dst": link}) for link in links)
+                pages.append(UpdateOne({"url": url}, update))
+        if self.client is None or not pages:
+            return
+        try:
+            if edges:
+                self.links.bulk_write(edges, ordered=True)
+            self.collection.bulk_write(pages, ordered=False)
+        except Exception as e:
+            logger.error(f"Error updating {len(pages)} pages in MongoDB: {e}")
+    
+    def close(self):
+        if self.client:
+            self.client.close()
+
+class HostHealth:
+    """Per-host circuit breaker; consecutive connect, SOCKS and timeout failures take a host down with exponential backoff"""
+    FAILURE_KINDS = ('socks', 'timeout', 'connect')
+    
+    def __init__(self):
+        self.hosts = {}
+        self.down = set()
+        # The parked URLs themselves wait in the frontier; this keeps one per host to probe it with
+        self.parked = {}
+        self._probing = set()
+        self._released = []
+    
+    @staticmethod
+    def host(url):
+        return urlsplit(url).netloc
+    
+    @staticmethod
+    def _backoff(failures):
+        return min(CONFIG['HOST_BACKOFF_BASE'] * 2 ** (failures - CONFIG['HOST_FAILURE_THRESHOLD']), CONFIG['HOST_BACKOFF_MAX'])
+    
+    def _due(self, host):
+        failures, retry_at = self.hosts.get(host, (None, 0.0))
+        return failures != 0 and time.monotonic() >= retry_at
+    
+    def check(self, url):
+        """Return 'fetch', 'probe' or 'park'; unknown, suspect and recovering hosts get one cheap probe at a time"""
+        host = self.host(url)
+        if self.hosts.get(host, (None,))[0] == 0:
+            return 'fetch'
+        if host in self._probing or not self._due(host):
+            return 'park'
+        self._probing.add(host)
+        return 'probe'
+    
+    async def probe(self, session, url):
+        host = self.host(url)
+        started = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=CONFIG['HOST_PROBE_TIMEOUT'])
+        try:
+            async with session.head(url, headers=HEADERS, timeout=timeout, allow_redirects=False):
+                pass
+        except Exception as e:
+            kind = CrawlerUtils.classify_error(e)
+            # Any other error still means something answered at the far end of the circuit
+            if kind in self.FAILURE_KINDS:
+                metrics.inc('host_probes', result=kind)
+                self.failure(url, kind)
+                return False
+        finally:
+            self._probing.discard(host)
+            metrics.observe('probe', time.perf_counter() - started)
+        metrics.inc('host_probes', result='up')
+        self.success(url)
+        return True
+    
+    def success(self, url):
+        host = self.host(url)
+        if host in self.down:
+            self.down.discard(host)
+            tqdm.write(f"Host back up: {host}")
+        self.hosts[host] = (0, 0.0)
+        if self.parked.pop(host, None):
+            self._released.append(host)
+    
+    def failure(self, url, kind):
+        if kind not in self.FAILURE_KINDS:
+            return
+        host = self.host(url)
+        failures = self.hosts.get(host, (0,))[0] + 1
+        retry_at = 0.0
+        if failures >= CONFIG['HOST_FAILURE_THRESHOLD']:
+            backoff = self._backoff(failures)
+            retry_at = time.monotonic() + backoff
+            if host not in self.down:
+                self.down.add(host)
+                tqdm.write(f"Host down: {host} ({kind}), retrying in {backoff:.0f}s")
+        self.hosts[host] = (failures, retry_at)
+    
+    def park(self, url):
+        self.parked.setdefault(self.host(url), url)
+        metrics.inc('parked')
+    
+    def due(self):
+        """Claim probe slots for hosts with parked URLs whose backoff has expired and yield one of their URLs"""
+        for host, url in list(self.parked.items()):
+            if len(self._probing) >= CONFIG['HOST_MAX_PROBES']:
+                return
+            if host not in self._probing and self._due(host):
+                self._probing.add(host)
+                yield url
+    
+    def released(self):
+        """Return the hosts whose parked URLs can go back into the frontier"""
+        released, self._released = self._released, []
+        return released
+    
+    def snapshot(self):
+        return {host: failures for host, (failures, _) in self.hosts.items() if failures}
+    
+    def restore(self, hosts):
+        # Monotonic deadlines do not survive a restart, so every restored host serves a fresh backoff
+        now = time.monotonic()
+        for host, failures in hosts.items():
+            if failures >= CONFIG['HOST_FAILURE_THRESHOLD']:
+                self.hosts[host] = (failures, now + self._backoff(failures))
+                self.down.add(host)
+            else:
+                self.hosts[host] = (failures, 0.0)
+
+host_health = HostHealth()
+
+class TorEndpoint:
+    """One Tor SOCKS endpoint with a session per isolation slot and its observed latency and error rate"""
+    def __init__(self, proxy, sessions):
+        self.proxy = proxy
+        self.sessions = sessions
+        self.latency = None
+        self.error_rate = 0.0
+        self.active = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+    
+    def cost(self):
+        # Expected wait behind the requests already in flight, inflated by the share of requests that fail
+        return (self.latency or 1.0) * (self.active + 1) / max(1.0 - self.error_rate, 0.1)
+    
+    def observe(self, latency=None, failed=False, broken=False):
+        self.error_rate = 0.9 * self.error_rate + 0.1 * (failed or broken)
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if not broken:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= CONFIG['TOR_EJECT_THRESHOLD']:
+            # Failures are not reset on ejection, so one more after readmission ejects it again
+            self.ejected_until = time.monotonic() + CONFIG['TOR_EJECT_SECONDS']
+            if self.failures == CONFIG['TOR_EJECT_THRESHOLD']:
+                logger.warning(f"Ejecting Tor endpoint {self.proxy} for {CONFIG['TOR_EJECT_SECONDS']}s after {self.failures} failures")
 
-async def crawl(url, session, mongo_manager, keyword=None):
+class TorPool:
+    """Balances requests over several Tor SOCKS endpoints by latency and error rate; exposes get/head like a ClientSession"""
+    # Only failing to reach or talk to the Tor client itself is the endpoint's fault
+    ENDPOINT_ERRORS = (ProxyConnectionError, ProxyTimeoutError)
+    
+    def __init__(self, proxies=(), connector=None):
+        if connector is not None:
+            # A caller-supplied connector (e.g. the offline benchmark) stands in for a single endpoint
+            self.endpoints = [TorEndpoint('direct', [aiohttp.ClientSession(connector=connector)])]
+        else:
+            token = os.urandom(8).hex()
+            self.endpoints = [
+                TorEndpoint(proxy, [
+                    aiohttp.ClientSession(connector=self._connector(proxy, slot, token))
+                    for slot in range(max(CONFIG['TOR_ISOLATION_SLOTS'], 1))
+                ])
+                for proxy in proxies
+            ]
+        self._affinity = {}
+    
+    @staticmethod
+    def _connector(proxy, slot, token):
+        # Idle connections are kept long enough for the host's next request to reuse its Tor stream and circuit
+        limits = {
+            'limit': CONFIG['MAX_CONCURRENT_REQUESTS'],
+            'limit_per_host': CONFIG['HOST_MAX_CONCURRENCY'],
+            'keepalive_timeout': CONFIG['KEEPALIVE_TIMEOUT']
+        }
+        parts = urlsplit(proxy)
+        if not CONFIG['TOR_ISOLATION_SLOTS'] or parts.username or not parts.scheme.startswith('socks5'):
+            return ProxyConnector.from_url(proxy, **limits)
+        # With IsolateSOCKSAuth (on by default) Tor never shares circuits between different SOCKS credentials
+        netloc = f"nemesis-{slot}:{token}@{parts.hostname}:{parts.port or 9050}"
+        return ProxyConnector.from_url(urlunsplit((parts.scheme, netloc, '', '', '')), **limits)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+    
+    def healthy(self):
+        now = time.monotonic()
+        return [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+    
+    def _endpoint(self, host):
+        # Rendezvous circuits to an onion service are slow to build, so a host sticks to one endpoint while it is healthy
+        endpoint = self._affinity.get(host)
+        if endpoint is not None and endpoint.ejected_until <= time.monotonic():
+            return endpoint
+        healthy = self.healthy()
+        if not healthy:
+            # Never stall the crawl: fall back to whichever endpoint is readmitted first
+            endpoint = min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)
+        else:
+            # Power of two choices spreads new hosts without herding them all onto the current best endpoint
+            endpoint = min(random.sample(healthy, min(len(healthy), 2)), key=TorEndpoint.cost)
+        self._affinity[host] = endpoint
+        return endpoint
+    
+    def get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+    
+    def head(self, url, **kwargs):
+        return self._request('HEAD', url, **kwargs)
+    
+    @asynccontextmanager
+    async def _request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        endpoint = self._endpoint(host)
+        session = endpoint.sessions[hash(host) % len(endpoint.sessions)]
+        started = time.perf_counter()
+        answered = False
+        endpoint.active += 1
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                answered = True
+                endpoint.observe(time.perf_counter() - started)
+                yield response
+        except Exception as e:
+            # Errors raised while the caller reads the body are not the endpoint's doing
+            if not answered:
+                broken = isinstance(e, self.ENDPOINT_ERRORS)
+                endpoint.observe(failed=CrawlerUtils.classify_error(e) in HostHealth.FAILURE_KINDS, broken=broken)
+                metrics.inc('proxy_errors', endpoint=endpoint.proxy, kind='endpoint' if broken else 'request')
+            raise
+        finally:
+            endpoint.active -= 1
+    
+    async def close(self):
+        await asyncio.gather(*(session.close() for endpoint in self.endpoints for session in endpoint.sessions), return_exceptions=True)
+
+async def read_html(response, extractor=None):
+    """Stream the body in chunks, enforcing MAX_BODY_BYTES and rejecting binary payloads on the first chunk"""
+    max_bytes = CONFIG['MAX_BODY_BYTES']
+    if response.content_length and response.content_length > max_bytes:
+        raise FetchAborted(f"Content-Length {response.content_length} exceeds {max_bytes} bytes")
+    charset = response.charset or 'utf-8'
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parts, size = [], 0
+    async for chunk in response.content.iter_chunked(CONFIG['FETCH_CHUNK_SIZE']):
+        if not size and CrawlerUtils.is_binary(chunk):
+            raise FetchAborted("binary content")
+        size += len(chunk)
+        metrics.inc('bytes_downloaded', len(chunk))
+        if size > max_bytes:
+            raise FetchAborted(f"body exceeds {max_bytes} bytes")
+        text = decoder.decode(chunk)
+        parts.append(text)
+        if extractor:
+            extractor.feed(text)
+    text = decoder.decode(b'', final=True)
+    parts.append(text)
+    if extractor:
+        extractor.feed(text)
+    return ''.join(parts)
+
+async def crawl(url, session, mongo_manager, matcher=None, parser=None, archive=None):
     if CrawlerUtils.is_skippable(url):
         tqdm.write(f"Skipping: {url}")
+        metrics.inc('fetches', result='skipped')
         await mongo_manager.save_page(url, "skipped", set())
-        return None, url, set()
+        return None, url, set(), None
+    started = time.perf_counter()
+    # sock_read bounds the wait for the response headers as well as any stall between body chunks
+    timeout = aiohttp.ClientTimeout(total=CONFIG['REQUEST_TIMEOUT'], sock_read=CONFIG['FIRST_BYTE_TIMEOUT'])
     try:
-        concurrency, delay = await CrawlerUtils.check_system_resources()
-        async with session.get(url, headers=HEADERS, timeout=30) as response:
+        async with session.get(url, headers=revisits.headers(url), timeout=timeout) as response:
+            host_health.success(url)
+            if response.status == 304:
+                metrics.observe('fetch', time.perf_counter() - started)
+                metrics.inc('fetches', result='not_modified')
+                # Links are expanded again in case the run that stored the page stopped before crawling them
+                links = await mongo_manager.links_found(url)
+                await mongo_manager.save_revisit(url, revisits.update(url, response))
+                tqdm.write(f"Not modified: {url}")
+                return '', url, links, None
             if response.status == 200 and 'text/html' in response.headers.get('Content-Type', ''):
-                html = await response.text()
-                CrawlerUtils.save_html_to_file(url, html)
-                links = CrawlerUtils.extract_onion_links(html, url)
-                await mongo_manager.save_page(url, "success", links, html)
-                if keyword and CrawlerUtils.check_keyword(html, keyword):
-                    CrawlerUtils.save_keyword_url(url, keyword)
-                    tqdm.write(f"Keyword match: {url} (Keyword: {keyword})")
+                # Opt-in: link-only crawls can tokenize the page while it downloads, but that runs on the event loop instead of the parse pool
+                extractor = FastLinkExtractor(collect_text=CONFIG['DEDUP_ENABLED']) if not matcher and CONFIG['FAST_LINK_EXTRACTOR'] and CONFIG['STREAM_LINK_EXTRACTION'] else None
+                try:
+                    html = await read_html(response, extractor)
+                except FetchAborted as e:
+                    response.close()
+                    metrics.inc('fetches', result='aborted')
+                    await mongo_manager.save_page(url, "aborted", set())
+                    tqdm.write(f"Aborted: {url} ({e})")
+                    return None, url, set(), None
+                metrics.observe('fetch', time.perf_counter() - started)
+                content_hash = hashlib.sha1(html.encode('utf-8')).hexdigest()
+                if revisits.unchanged(url, content_hash):
+                    metrics.inc('fetches', result='unchanged')
+                    links = await mongo_manager.links_found(url)
+                    await mongo_manager.save_revisit(url, revisits.update(url, response, content_hash))
+                    tqdm.write(f"Unchanged: {url}")
+                    return html, url, links, None
+                revisit = revisits.update(url, response, content_hash)
+                metrics.inc('fetches', result='ok')
+                if extractor:
+                    with metrics.timer('parse'):
+                        page = extractor.page(url)
+                    if CONFIG['DEDUP_ENABLED']:
+                        page['fingerprint'] = await parser.fingerprint(page['text']) if parser else fingerprint(page['text'])
+                elif parser:
+                    page = await parser.parse(html, url)
+                else:
+                    with metrics.timer('parse'):
+                        page = parse_page(html, url, matcher, links_only=not matcher)
+                hits = page['keyword_hits']
+                duplicate_of = fingerprints.check(url, page['fingerprint']) if page['fingerprint'] else None
+                # Mirrors and clones are recorded but their links are not expanded again
+                links = set() if duplicate_of else page['links']
+                stored_html = html if not duplicate_of or CONFIG['STORE_DUPLICATE_HTML'] else None
+                if archive and stored_html:
+                    await archive.save(url, stored_html)
+                await mongo_manager.save_page(url, "success", links, stored_html, hits, duplicate_of, revisit)
+                if duplicate_of:
+                    metrics.inc('duplicates')
+                if hits:
+                    metrics.inc('keyword_matches')
+                    CrawlerUtils.save_keyword_url(url, hits)
+                    tqdm.write(f"Keyword match: {url} (Keywords: {KeywordMatcher.format_hits(hits)})")
+                elif duplicate_of:
+                    tqdm.write(f"Duplicate: {url} (of {duplicate_of})")
                 else:
                     tqdm.write(f"Crawled: {url}")
-                return html, url, links
+                return html, url, links, page
             else:
                 status = f"failed_with_status_{response.status}"
+                metrics.inc('fetches', result=f"http_{response.status}" if response.status != 200 else 'non_html')
                 await mongo_manager.save_page(url, status, set())
                 tqdm.write(f"Non-HTML: {url} (Status: {response.status})")
-                return None, url, set()
+                return None, url, set(), None
     except Exception as e:
+        kind = CrawlerUtils.classify_error(e)
+        host_health.failure(url, kind)
+        metrics.inc('fetches', result=kind)
+        metrics.observe('fetch_failed', time.perf_counter() - started)
         await mongo_manager.save_page(url, f"failed_with_error_{str(e)}", set())
         tqdm.write(f"Error crawling {url}: {e}")
-        return None, url, set()
+        return None, url, set(), None
 
-async def main(args):
-    global time_limit_reached
-    display_ascii_banner()  # Banner now only shows once at start of main
+class ResourceMonitor:
+    def __init__(self):
+        self.cpu = 0.0
+        self.mem = psutil.virtual_memory().percent
+        self.loop_lag = 0.0
+        self._task = None
     
-    # Handle Output Directory
-    base_dir = os.path.abspath(args.output_dir) if args.output_dir else os.path.abspath('data')
-    keyword = args.keyword if args.keyword else "nokeyword"
+    def start(self):
+        # Non-blocking cpu_percent measures since the previous call, so prime it once here
+        psutil.cpu_percent(interval=None)
+        self._task = asyncio.create_task(self._sample())
     
-    # Ensure base directory exists before scanning
-    os.makedirs(base_dir, exist_ok=True)
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
     
-    # Find existing keyword_* subdirs
-    existing_dirs = [
-        d for d in os.listdir(base_dir)
-        if os.path.isdir(os.path.join(base_dir, d))
-        and d.startswith(f"{keyword}_")
-    ]
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(CONFIG['RESOURCE_SAMPLE_INTERVAL'])
+            # Oversleep is the time the loop was busy with callbacks when this timer was due
+            self.loop_lag = max(loop.time() - started - CONFIG['RESOURCE_SAMPLE_INTERVAL'], 0.0)
+            self.cpu = psutil.cpu_percent(interval=None)
+            self.mem = psutil.virtual_memory().percent
+    
+    def overload(self):
+        if self.mem > CONFIG['MAX_RAM_USAGE_PERCENT'] or self.cpu > CONFIG['MAX_CPU_USAGE_PERCENT']:
+            return max(self.mem - CONFIG['MAX_RAM_USAGE_PERCENT'], self.cpu - CONFIG['MAX_CPU_USAGE_PERCENT']) / 100
+        return 0.0
+
+class ConcurrencyController:
+    # Only proxy failures and timeouts point at an overloaded Tor client; dead hosts, 404s and aborted bodies do not
+    CONGESTION_ERRORS = ('socks', 'timeout')
+    
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.limit = CONFIG['CONCURRENT_REQUESTS']
+        self.delay = CONFIG['REQUEST_DELAY']
+        self.latency = None
+        self.fetches = 0
+        self.errors = self._congestion_errors()
+    
+    def _congestion_errors(self):
+        # crawl() already classifies every failure into the fetch counters, so the controller reads them from there
+        return sum(metrics.counters[('fetches', (('result', kind),))] for kind in self.CONGESTION_ERRORS)
+    
+    def observe(self, latency):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.fetches += 1
+    
+    def adjust(self):
+        overload = self.monitor.overload()
+        errors = self._congestion_errors()
+        error_rate = min((errors - self.errors) / self.fetches, 1.0) if self.fetches else 0.0
+        congested = self.latency is not None and self.latency > CONFIG['TARGET_FETCH_LATENCY']
+        # Additive increase while healthy, multiplicative decrease on any congestion signal
+        if overload or error_rate > CONFIG['MAX_ERROR_RATE'] or congested:
+            limit = max(CONFIG['MIN_CONCURRENT_REQUESTS'], int(self.limit * CONFIG['AIMD_DECREASE_FACTOR']))
+        elif self.fetches:
+            limit = min(CONFIG['MAX_CONCURRENT_REQUESTS'], self.limit + CONFIG['AIMD_INCREASE_STEP'])
+        else:
+            limit = self.limit
+        self.delay = CONFIG['REQUEST_DELAY'] * (1 + overload)
+        if limit < self.limit:
+            tqdm.write(f"Backing off (CPU: {self.monitor.cpu}%, RAM: {self.monitor.mem}%, latency: {self.latency or 0:.1f}s, "
+                       f"errors: {error_rate:.0%}). Adjusting to {limit} concurrent requests, {self.delay:.1f}s delay")
+        self.limit = limit
+        self.fetches, self.errors = 0, errors
+        return limit
+
+class SQLiteFrontier(asyncio.Queue):
+    """Disk-backed priority frontier; items are (url, priority, depth) in both directions"""
+    # A URL handed back before it was completed, such as one parked behind a dead host, becomes ready again
+    INSERT = ("INSERT INTO frontier (url, priority, depth) VALUES (?, ?, ?) "
+              "ON CONFLICT (url) DO UPDATE SET taken = 0, parked_host = NULL, priority = excluded.priority WHERE taken = 1")
+    
+    def __init__(self, path):
+        self.path = path
+        super().__init__()
+    
+    def _init(self, maxsize):
+        self._db = sqlite3.connect(self.path, isolation_level=None)
+        # Without fsync a killed crawler still loses nothing; after an OS crash, delete frontier.db so --resume replays all of queue.txt
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL, priority REAL NOT NULL, depth INTEGER NOT NULL, "
+            "taken INTEGER NOT NULL DEFAULT 0, parked_host TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(frontier)")}
+        for column, definition in (('taken', 'INTEGER NOT NULL DEFAULT 0'), ('parked_host', 'TEXT')):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE frontier ADD COLUMN {column} {definition}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS frontier_ready ON frontier (taken, priority DESC, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS frontier_parked ON frontier (parked_host) WHERE parked_host IS NOT NULL")
+        # Rows stay until their URL is completed, so whatever a killed run had popped or parked but not finished comes
+        # back here; parked ones are checked against the restored host state again
+        self._db.execute("UPDATE frontier SET taken = 0, parked_host = NULL WHERE taken = 1")
+        self._size = self._db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+        self._completed = []
+        self.parked = 0
+    
+    def qsize(self):
+        return self._size
+    
+    def empty(self):
+        return self._size == 0
     
-    # Extract the highest number
-    numbers = []
-    for d in existing_dirs:
+    def _put(self, item):
+        url, priority, depth = item
+        cursor = self._db.execute(self.INSERT, (url, priority, depth))
+        self._size += cursor.rowcount
+    
+    def put_many(self, items):
+        """Insert a batch in one transaction, for resume; put_nowait() commits every row on its own"""
+        items = list(items)
+        self._db.execute("BEGIN")
+        try:
+            cursor = self._db.executemany(self.INSERT, items)
+        finally:
+            self._db.execute("COMMIT")
+        self._size += cursor.rowcount
+        # The task accounting and wake-ups put_nowait() does for each item
+        self._unfinished_tasks += len(items)
+        self._finished.clear()
+        for _ in range(min(cursor.rowcount, len(self._getters))):
+            self._wakeup_next(self._getters)
+    
+    def _get(self):
+        row_id, url, priority, depth = self._db.execute(
+            "SELECT id, url, priority, depth FROM frontier WHERE taken = 0 ORDER BY priority DESC, id LIMIT 1"
+        ).fetchone()
+        self._db.execute("UPDATE frontier SET taken = 1 WHERE id = ?", (row_id,))
+        self._size -= 1
+        return url, priority, depth
+    
+    def snapshot(self):
+        for (url,) in self._db.execute("SELECT url FROM frontier WHERE taken = 0 OR parked_host IS NOT NULL ORDER BY priority DESC, id"):
+            yield url
+    
+    def complete(self, url):
+        # Deleted by flush() once visited_links.txt holds the URL, so a killed run cannot lose it in between
+        self._completed.append(url)
+    
+    def flush(self):
+        completed, self._completed = self._completed, []
+        self._db.execute("BEGIN")
         try:
-            num = int(d.split('_')[-1])
-            numbers.append(num)
-        except (ValueError, IndexError):
-            continue
-    next_number = max(numbers, default=0) + 1
+            self._db.executemany("DELETE FROM frontier WHERE url = ?", ((url,) for url in completed))
+        finally:
+            self._db.execute("COMMIT")
+    
+    def park(self, url, host):
+        cursor = self._db.execute("UPDATE frontier SET parked_host = ? WHERE url = ? AND parked_host IS NULL", (host, url))
+        self.parked += cursor.rowcount
+    
+    def release(self, host):
+        """Return the (url, depth) pairs parked behind host; putting them back makes them ready again"""
+        released = self._db.execute("SELECT url, depth FROM frontier WHERE parked_host = ?", (host,)).fetchall()
+        self.parked -= len(released)
+        return released
+    
+    def close(self):
+        self.flush()
+        self._db.close()
+
+class MongoFrontier:
+    """Cluster frontier in MongoDB; nodes claim URLs with expiring leases and own hosts by domain hash"""
+    def __init__(self, db, node_id):
+        self.node_id = node_id
+        self.urls = db[CONFIG['CLUSTER_FRONTIER_COLLECTION']]
+        self.nodes = db[CONFIG['CLUSTER_NODES_COLLECTION']]
+        self.urls.create_index([("url", 1)], unique=True)
+        self.urls.create_index([("state", 1), ("slot", 1), ("priority", -1)])
+        self.urls.create_index([("state", 1), ("lease_expires", 1)])
+        # One thread keeps blocking pymongo calls off the event loop and applies them in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cluster-frontier')
+        self._pending = []
+        self._completed = []
+        self._claimed = deque()
+        self._claim_lock = asyncio.Lock()
+        self._slots = []
+        self._size = 0
+        self._exhausted = False
+        self._last_heartbeat = None
+        self._sync_task = None
+    
+    @staticmethod
+    def _digest(value):
+        return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+    
+    def slot(self, url):
+        # Each slot belongs to exactly one live node, so a host is only ever crawled from one node
+        return self._digest(urlparse(url).netloc) % CONFIG['CLUSTER_SLOTS']
+    
+    def qsize(self):
+        return self._size + len(self._claimed)
+    
+    def empty(self):
+        return self._exhausted and not self._claimed and not self._pending
+    
+    def put_nowait(self, item):
+        url, priority, depth = item
+        self._pending.append((url, priority, depth))
+    
+    def put_many(self, items):
+        self._pending.extend(items)
+    
+    def complete(self, url):
+        self._completed.append(url)
+    
+    def flush(self):
+        # Completions go out with the next sync
+        pass
+    
+    # Parked URLs are left uncompleted in MongoDB, where their lease lapses and hands them back later
+    parked = 0
+    
+    def park(self, url, host):
+        pass
+    
+    def release(self, host):
+        return []
+    
+    def task_done(self):
+        pass
+    
+    def snapshot(self):
+        # Only the node-local share; the shared backlog stays in MongoDB
+        yield from (url for url, _, _ in list(self._claimed))
+        yield from (url for url, _, _ in list(self._pending))
+    
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._claimed:
+                return self._claimed.popleft()
+            async with self._claim_lock:
+                if self._claimed:
+                    continue
+                if self._sync_task is None:
+                    await loop.run_in_executor(self._executor, self._heartbeat)
+                    self._sync_task = asyncio.create_task(self._sync_loop())
+                await self._flush()
+                claimed = await loop.run_in_executor(self._executor, self._claim, CONFIG['CLUSTER_CLAIM_BATCH'])
+                self._claimed.extend(claimed)
+                self._exhausted = not claimed
+                if claimed:
+                    continue
+                await asyncio.sleep(CONFIG['CLUSTER_POLL_INTERVAL'])
+    
+    async def _flush(self):
+        if self._pending or self._completed:
+            pending, self._pending = self._pending, []
+            completed, self._completed = self._completed, []
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write, pending, completed)
+    
+    async def _sync_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(CONFIG['CLUSTER_FLUSH_INTERVAL'])
+            try:
+                await self._flush()
+                if time.monotonic() - self._last_heartbeat >= CONFIG['CLUSTER_HEARTBEAT_INTERVAL']:
+                    await loop.run_in_executor(self._executor, self._heartbeat)
+            except Exception as e:
+                logger.warning(f"Cluster frontier sync failed: {e}")
+    
+    def _heartbeat(self):
+        now = datetime.now(timezone.utc)
+        self._last_heartbeat = time.monotonic()
+        self.nodes.update_one({"_id": self.node_id}, {"$set": {"last_seen": now}}, upsert=True)
+        live = [node["_id"] for node in self.nodes.find({"last_seen": {"$gte": now - timedelta(seconds=CONFIG['CLUSTER_NODE_TIMEOUT'])}}, {"_id": 1})]
+        live = live or [self.node_id]
+        self._slots = [
+            slot for slot in range(CONFIG['CLUSTER_SLOTS'])
+            if max(live, key=lambda node: self._digest(f"{node}:{slot}")) == self.node_id
+        ]
+        # Leases left behind by dead nodes go back to the queue on whichever node notices them first
+        reclaimed = self.urls.update_many(
+            {"state": "leased", "lease_expires": {"$lt": now}},
+            {"$set": {"state": "queued"}, "$unset": {"lease_owner": "", "lease_expires": ""}}
+        ).modified_count
+        if reclaimed:
+            logger.info(f"Reclaimed {reclaimed} expired frontier leases")
+        self._size = self.urls.count_documents({"state": "queued"})
+    
+    def _claim(self, limit):
+        claimed = []
+        if not self._slots:
+            return claimed
+        expires = datetime.now(timezone.utc) + timedelta(seconds=CONFIG['CLUSTER_LEASE_SECONDS'])
+        for _ in range(limit):
+            document = self.urls.find_one_and_update(
+                {"state": "queued", "slot": {"$in": self._slots}},
+                {"$set": {"state": "leased", "lease_owner": self.node_id, "lease_expires": expires}},
+                sort=[("priority", -1)],
+                projection={"url": 1, "priority": 1, "depth": 1}
+            )
+            if document is None:
+                break
+            claimed.append((document["url"], document["priority"], document["depth"]))
+        return claimed
+    
+    def _write(self, pending, completed):
+        # $setOnInsert makes enqueueing idempotent across nodes: a URL queued or crawled anywhere is never reset
+        requests = [
+            UpdateOne({"url": url}, {"$setOnInsert": {
+                "url": url, "state": "queued", "slot": self.slot(url), "priority": priority, "depth": depth,
+                "discovered_by": self.node_id
+            }}, upsert=True)
+            for url, priority, depth in pending
+        ]
+        requests.extend(
+            UpdateOne({"url": url}, {"$set": {"state": "done", "crawled_by": self.node_id}, "$unset": {"lease_owner": "", "lease_expires": ""}})
+            for url in completed
+        )
+        if not requests:
+            return
+        try:
+            self.urls.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # Concurrent upserts of the same URL from two nodes surface as duplicate-key errors and are harmless
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != 11000]
+            if errors:
+                logger.error(f"Error writing {len(errors)} frontier updates: {errors[0].get('errmsg')}")
+        except Exception as e:
+            logger.error(f"Error writing {len(requests)} frontier updates: {e}")
+    
+    def _release(self):
+        self.urls.update_many(
+            {"state": "leased", "lease_owner": self.node_id},
+            {"$set": {"state": "queued"}, "$unset": {"lease_owner": "", "lease_expires": ""}}
+        )
+        self.nodes.delete_one({"_id": self.node_id})
+    
+    def close(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+        pending, self._pending = self._pending, []
+        completed, self._completed = self._completed, []
+        # Hand unfinished leases back right away instead of letting them expire
+        self._executor.submit(self._write, pending, completed).result()
+        try:
+            self._executor.submit(self._release).result()
+        except Exception as e:
+            logger.warning(f"Could not release frontier leases: {e}")
+        self._executor.shutdown(wait=True)
+
+class FrontierScorer:
+    """Default breadth-first priority: shallower links first, FIFO within a depth"""
+    def score(self, url, depth, parent_matched=False, anchor_text=''):
+        return -depth
+    
+    def record(self, url, matched):
+        pass
+
+class FocusedScorer(FrontierScorer):
+    """Ranks links by how likely they are to lead to keyword matches"""
+    PARENT_MATCH_WEIGHT = 4.0
+    ANCHOR_MATCH_WEIGHT = 3.0
+    DOMAIN_HIT_WEIGHT = 2.0
+    DEPTH_WEIGHT = 0.5
+    
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.domain_stats = {}
+    
+    def record(self, url, matched):
+        domain = urlparse(url).netloc
+        pages, hits = self.domain_stats.get(domain, (0, 0))
+        self.domain_stats[domain] = (pages + 1, hits + int(matched))
+    
+    def domain_hit_rate(self, url):
+        pages, hits = self.domain_stats.get(urlparse(url).netloc, (0, 0))
+        # Laplace smoothing keeps unseen domains at an even prior
+        return (hits + 1) / (pages + 2)
+    
+    def score(self, url, depth, parent_matched=False, anchor_text=''):
+        return (self.PARENT_MATCH_WEIGHT * parent_matched
+                + self.ANCHOR_MATCH_WEIGHT * bool(anchor_text and self.matcher.match(anchor_text))
+                + self.DOMAIN_HIT_WEIGHT * self.domain_hit_rate(url)
+                - self.DEPTH_WEIGHT * depth)
+
+class HostScheduler:
+    """Per-host ready queues between the frontier and the workers, with per-host concurrency and spacing"""
+    def __init__(self, frontier):
+        self.frontier = frontier
+        # Per-host heaps of (-priority, seq, url, depth) in rotation order; a host moves to the back each time it is served
+        self.queues = OrderedDict()
+        self.active = Counter()
+        self.next_at = {}
+        self.spacing = CONFIG['REQUEST_DELAY']
+        self.workers = CONFIG['CONCURRENT_REQUESTS']
+        self.buffered = 0
+        # Buffered and in-flight URLs, so a cluster lease that expired and came back is not fetched twice
+        self._urls = set()
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._feeder = None
+    
+    def start(self):
+        self._feeder = asyncio.create_task(self._feed())
+    
+    async def close(self):
+        if self._feeder:
+            self._feeder.cancel()
+            await asyncio.gather(self._feeder, return_exceptions=True)
+    
+    def _hungry(self):
+        # Only URLs a worker could take now count against the lookahead, so a run of links from one saturated host is
+        # pulled past until other hosts turn up; anything buffered here is out of reach of better-scored links and holds
+        # a lease in cluster mode, hence the hard cap
+        now = time.monotonic()
+        ready = servable = 0
+        for host, queue in self.queues.items():
+            if self.active[host] < CONFIG['HOST_MAX_CONCURRENCY'] and self.next_at.get(host, 0.0) <= now:
+                ready += 1
+                servable += len(queue)
+        return (self.buffered < CONFIG['HOST_BUFFER_MAX'] and ready < self.workers
+                and servable < CONFIG['HOST_LOOKAHEAD_PER_WORKER'] * self.workers)
+    
+    async def _wait(self, timeout=None):
+        # No await separates a waiter's last check from clear(), so a set() in between cannot be missed
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _feed(self):
+        while True:
+            while not self._hungry():
+                await self._wait()
+            url, priority, depth = await self.frontier.get()
+            if url in self._urls:
+                self.frontier.task_done()
+                continue
+            self._urls.add(url)
+            heapq.heappush(self.queues.setdefault(urlsplit(url).netloc, []), (-priority, next(self._sequence), url, depth))
+            self.buffered += 1
+            self._changed.set()
+    
+    async def get(self):
+        while True:
+            now = time.monotonic()
+            wake = best = None
+            for host, queue in self.queues.items():
+                if self.active[host] >= CONFIG['HOST_MAX_CONCURRENCY']:
+                    continue
+                next_at = self.next_at.get(host, 0.0)
+                if next_at > now:
+                    wake = next_at if wake is None else min(wake, next_at)
+                    continue
+                # The best-scored URL among the ready hosts goes first; rotation order only breaks ties
+                if best is None or queue[0][0] < self.queues[best][0][0]:
+                    best = host
+            if best is None:
+                await self._wait(None if wake is None else wake - now)
+                continue
+            queue = self.queues[best]
+            _, _, url, depth = heapq.heappop(queue)
+            if queue:
+                self.queues.move_to_end(best)
+            else:
+                del self.queues[best]
+            self.buffered -= 1
+            self.active[best] += 1
+            self.next_at[best] = now + self.spacing
+            self._changed.set()
+            return url, depth
+    
+    def done(self, url):
+        self._urls.discard(url)
+        host = urlsplit(url).netloc
+        self.active[host] -= 1
+        if self.active[host] <= 0:
+            del self.active[host]
+            # Once its spacing has passed, an idle host needs no entry
+            if self.next_at.get(host, 0.0) <= time.monotonic():
+                self.next_at.pop(host, None)
+        self._changed.set()
+    
+    def snapshot(self):
+        return [url for queue in list(self.queues.values()) for _, _, url, _ in sorted(queue)]
+
+class CrawlScheduler:
+    def __init__(self, session, mongo_manager, progress, matcher=None, parser=None, scorer=None, archive=None, frontier=None):
+        self.session = session
+        self.mongo_manager = mongo_manager
+        self.parser = parser
+        self.archive = archive
+        self.progress = progress
+        self.matcher = matcher
+        self.scorer = scorer or (FocusedScorer(matcher) if matcher else FrontierScorer())
+        self.monitor = ResourceMonitor()
+        self.controller = ConcurrencyController(self.monitor)
+        self.frontier = frontier or SQLiteFrontier(os.path.join(CONFIG['DATA_DIR'], CONFIG['FRONTIER_DB']))
+        self.hosts = HostScheduler(self.frontier)
+        self.in_flight = set()
+        self.workers = []
+        self.probes = set()
+        self._retiring = 0
+    
+    def enqueue(self, url, priority=0, depth=0, journal=True):
+        url = CrawlerUtils.canonicalize(url)
+        if url in visited or url in queue_filter:
+            return False
+        queue_filter.add(url)
+        self.frontier.put_nowait((url, priority, depth))
+        if journal:
+            URLManager.append_queue(url)
+        return True
+    
+    def seed(self, urls):
+        # Seeds come from queue.txt or are written by the next compaction, so they are not journaled again
+        for url in urls:
+            self.enqueue(url, journal=False)
+    
+    def restore(self, urls):
+        # These URLs already passed the restored queue_filter, so they bypass it; the frontier's unique url column
+        # drops the ones it still holds
+        items = []
+        for url in urls:
+            url = CrawlerUtils.canonicalize(url)
+            if url not in visited:
+                queue_filter.add(url)
+                items.append((url, 0, 0))
+        self.frontier.put_many(items)
+    
+    def checkpoint(self, in_flight=None):
+        with metrics.timer('checkpoint'):
+            self._checkpoint(in_flight)
+    
+    def _checkpoint(self, in_flight):
+        fingerprints.flush()
+        CheckpointManager.save({
+            'keywords': self.matcher.keywords if self.matcher else [],
+            'regexes': self.matcher.regexes if self.matcher else [],
+            'in_flight': list(self.in_flight if in_flight is None else in_flight) + self.hosts.snapshot(),
+            'hosts': host_health.snapshot(),
+            'visited_offset': URLManager.journal('visited_links.txt').tell(),
+            'queue_offset': URLManager.journal('queue.txt').tell(),
+            'pages_crawled': self.progress.n,
+            'created': datetime.now(timezone.utc).isoformat()
+        })
+    
+    def pending(self):
+        return itertools.chain(list(self.in_flight), self.hosts.snapshot(), self.frontier.snapshot())
+    
+    def _record(self, html, url, new_links, page, depth):
+        if html and new_links:
+            tqdm.write(f"Found {len(new_links)} new links on {url}")
+        matched = bool(page and page['keyword_hits'])
+        anchors = page['anchors'] if page else {}
+        if html:
+            self.scorer.record(url, matched)
+        for link in new_links:
+            if CrawlerUtils.is_valid_onion_url(link):
+                self.enqueue(link, self.scorer.score(link, depth + 1, matched, anchors.get(link, '')), depth + 1)
+        if url not in visited:
+            visited.add(url)
+            URLManager.save_visited(url)
+            metrics.inc('pages')
+            self.progress.update(1)
+            self.progress.total = len(visited)
+    
+    def update_gauges(self):
+        metrics.set('frontier_size', self.frontier.qsize())
+        metrics.set('host_queue_urls', self.hosts.buffered)
+        metrics.set('host_queues', len(self.hosts.queues))
+        metrics.set('in_flight', len(self.in_flight))
+        metrics.set('concurrency_limit', self.controller.limit)
+        metrics.set('hosts_down', len(host_health.down))
+        metrics.set('proxies_healthy', len(self.session.healthy()))
+        metrics.set('parked_urls', self.frontier.parked)
+        metrics.set('request_delay_seconds', self.controller.delay)
+        metrics.set('fetch_latency_ewma_seconds', self.controller.latency or 0.0)
+        metrics.set('event_loop_lag_seconds', self.monitor.loop_lag)
+        metrics.set('cpu_percent', self.monitor.cpu)
+        metrics.set('memory_percent', self.monitor.mem)
+    
+    def write_stats(self):
+        self.update_gauges()
+        try:
+            metrics.write_stats(os.path.join(CONFIG['DATA_DIR'], CONFIG['STATS_FILE']))
+        except OSError as e:
+            logger.warning(f"Could not write stats file: {e}")
+    
+    def resize(self, size):
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        active = len(self.workers) - self._retiring
+        if size < active:
+            self._retiring += active - size
+        elif size > active:
+            # Cancel pending retirements first, then spawn whatever is still missing
+            revived = min(self._retiring, size - active)
+            self._retiring -= revived
+            for _ in range(size - active - revived):
+                self.workers.append(asyncio.create_task(self._worker()))
+    
+    async def _host_ready(self, url):
+        """Park URLs of hosts that are down and probe unknown or recovering hosts before the full fetch"""
+        action = host_health.check(url)
+        if action == 'probe':
+            action = 'fetch' if await host_health.probe(self.session, url) else 'park'
+        if action == 'park':
+            host_health.park(url)
+            self.frontier.park(url, host_health.host(url))
+            return False
+        return True
+    
+    def _release_hosts(self):
+        # Hosts that answered again get their parked URLs back at the current priority for their depth
+        for host in host_health.released():
+            self.frontier.put_many([(url, self.scorer.score(url, depth), depth) for url, depth in self.frontier.release(host)])
+        for url in host_health.due():
+            probe = asyncio.create_task(host_health.probe(self.session, url))
+            self.probes.add(probe)
+            probe.add_done_callback(self.probes.discard)
+    
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while not time_limit_reached:
+            if self._retiring:
+                self._retiring -= 1
+                return
+            url, depth = await self.hosts.get()
+            self.in_flight.add(url)
+            try:
+                if url in visited:
+                    self.frontier.complete(url)
+                    continue
+                # Parked URLs are not completed; the frontier holds them until their host answers again
+                if not await self._host_ready(url):
+                    continue
+                started = loop.time()
+                html, url, new_links, page = await crawl(url, self.session, self.mongo_manager, self.matcher, self.parser, self.archive)
+                self.controller.observe(loop.time() - started)
+                self._record(html, url, new_links, page, depth)
+                self.frontier.complete(url)
+            finally:
+                self.in_flight.discard(url)
+                self.hosts.done(url)
+                self.frontier.task_done()
+    
+    def _reseed(self):
+        random_url = random.choice(SEED_URLS)
+        if self.enqueue(random_url):
+            logger.info(f"Queue empty. Added random seed URL: {random_url}")
+            return True
+        logger.info("Queue empty and all seed URLs already visited. Waiting...")
+        return False
+    
+    async def run(self, deadline):
+        global time_limit_reached
+        loop = asyncio.get_running_loop()
+        self.monitor.start()
+        self.hosts.start()
+        self.resize(self.controller.limit)
+        last_flush = last_compact = last_adjust = last_checkpoint = last_stats = loop.time()
+        next_reseed = 0.0
+        try:
+            while not time_limit_reached:
+                if datetime.now() >= deadline:
+                    logger.info("Time limit reached. Stopping crawler.")
+                    time_limit_reached = True
+                    break
+                self._release_hosts()
+                now = loop.time()
+                if self.frontier.empty() and not self.in_flight and not self.hosts.buffered and now >= next_reseed:
+                    # Back off like the old batch loop did, instead of logging the same miss every tick
+                    if not self._reseed():
+                        next_reseed = now + CONFIG['RESEED_BACKOFF']
+                if now - last_adjust >= CONFIG['CONTROL_INTERVAL']:
+                    self.resize(self.controller.adjust())
+                    # The politeness delay is spacing between requests to the same host, not a pause for every worker
+                    self.hosts.spacing = self.controller.delay
+                    self.hosts.workers = self.controller.limit
+                    last_adjust = now
+                compacted = now - last_compact >= CONFIG['QUEUE_COMPACT_INTERVAL']
+                if compacted:
+                    URLManager.save_queue(self.pending())
+                    last_compact = last_flush = now
+                elif now - last_flush >= CONFIG['JOURNAL_FLUSH_INTERVAL']:
+                    URLManager.flush_journals()
+                    self.frontier.flush()
+                    last_flush = now
+                # Compaction rewrites queue.txt, so the checkpoint's queue_offset is taken again right after it
+                if compacted or now - last_checkpoint >= CONFIG['CHECKPOINT_INTERVAL']:
+                    self.checkpoint()
+                    last_checkpoint = now
+                if now - last_stats >= CONFIG['STATS_INTERVAL']:
+                    self.write_stats()
+                    last_stats = now
+                else:
+                    self.update_gauges()
+                await asyncio.sleep(CONFIG['SCHEDULER_TICK'])
+        finally:
+            # Snapshot before cancelling so URLs still in flight are kept in the saved queue
+            in_flight = list(self.in_flight)
+            pending = self.pending()
+            for task in self.workers + list(self.probes):
+                task.cancel()
+            await asyncio.gather(*self.workers, *self.probes, return_exceptions=True)
+            await self.hosts.close()
+            await self.monitor.stop()
+            URLManager.save_queue(pending)
+            URLManager.flush_journals()
+            self.checkpoint(in_flight)
+            self.write_stats()
+            self.frontier.close()
+
+async def main(args, connector=None):
+    display_ascii_banner()  # Banner now only shows once at start of main
+    
+    if args.resume:
+        # Resume in place: reuse the previous run's subdirectory instead of creating a new one
+        CONFIG['DATA_DIR'] = os.path.abspath(args.resume)
+        if not os.path.isdir(CONFIG['DATA_DIR']):
+            print(f"Error: Resume directory not found: {CONFIG['DATA_DIR']}")
+            sys.exit(1)
+    else:
+        # Handle Output Directory
+        base_dir = os.path.abspath(args.output_dir) if args.output_dir else os.path.abspath('data')
+        keyword = args.matcher.label if args.matcher else "nokeyword"
+        
+        # Ensure base directory exists before scanning
+        os.makedirs(base_dir, exist_ok=True)
+        
+        # Find existing keyword_* subdirs
+        existing_dirs = [
+            d for d in os.listdir(base_dir)
+            if os.path.isdir(os.path.join(base_dir, d))
+            and d.startswith(f"{keyword}_")
+        ]
+        
+        # Extract the highest number
+        numbers = []
+        for d in existing_dirs:
+            try:
+                num = int(d.split('_')[-1])
+                numbers.append(num)
+            except (ValueError, IndexError):
+                continue
+        next_number = max(numbers, default=0) + 1
+        
+        CONFIG['DATA_DIR'] = os.path.join(base_dir, f"{keyword}_{next_number}")
     
     # Set directory paths
-    CONFIG['DATA_DIR'] = os.path.join(base_dir, f"{keyword}_{next_number}")
     CONFIG['RAW_PAGES_DIR'] = os.path.join(CONFIG['DATA_DIR'], 'raw_pages')
 
     # Ensure directories exist
@@ -400,19 +2742,56 @@ async def main(args):
             datefmt='%Y-%m-%d %H:%M:%S'
         ))
 
-    logger.info(f"Starting Nemesis crawler (Time limit: {args.time} minutes, Keyword: {args.keyword or 'None'})")
+    logger.info(f"Starting Nemesis crawler (Time limit: {args.time} minutes, Keywords: {args.matcher or 'None'})")
     logger.info(f"Output directory: {CONFIG['DATA_DIR']}")
 
-    ResourceManager.check_tor()
-    ResourceManager.clear_old_data(use_custom_dir=bool(args.output_dir))
+    if args.proxy:
+        CONFIG['TOR_PROXIES'] = args.proxy
+    # A caller-supplied connector (e.g. the offline benchmark) does not go through Tor
+    proxies = await ResourceManager.check_tor(CONFIG['TOR_PROXIES']) if connector is None else []
+    if proxies:
+        logger.info(f"Using {len(proxies)} Tor SOCKS endpoint(s): {', '.join(proxies)}")
+    if args.incremental and args.cluster:
+        logger.error("Incremental mode is not supported in cluster mode.")
+        sys.exit(1)
+    # Cluster nodes share the Mongo collections, so a joining node must not wipe them; incremental runs build on them
+    if not args.resume and not args.cluster and not args.incremental:
+        ResourceManager.clear_old_data(use_custom_dir=bool(args.output_dir))
     mongo_manager = MongoManager()
+    frontier = None
+    if args.cluster:
+        if mongo_manager.db is None:
+            logger.error("Cluster mode needs MongoDB for the shared frontier.")
+            sys.exit(1)
+        node_id = args.node_id or f"{socket.gethostname()}-{os.getpid()}"
+        frontier = MongoFrontier(mongo_manager.db, node_id)
+        logger.info(f"Joining crawl cluster as node {node_id}")
     start_time = datetime.now()
     time_limit = timedelta(minutes=args.time)
-    queue = URLManager.load_queue()
-    visited_set = URLManager.load_visited()
+    checkpoint = CheckpointManager.load() if args.resume else None
+    # frontier.db keeps every URL that was queued and not completed, so a resume only needs what was appended after the checkpoint
+    frontier_kept = checkpoint and os.path.exists(os.path.join(CONFIG['DATA_DIR'], CONFIG['FRONTIER_DB']))
+    queue = URLManager.load_queue(checkpoint.get('queue_offset', 0) if frontier_kept else 0)
+    if checkpoint:
+        # Keywords given on the command line override the ones the interrupted run used
+        args.matcher = args.matcher or KeywordMatcher(checkpoint.get('keywords', []), checkpoint.get('regexes', [])) or None
+        logger.info(f"Resumed from checkpoint of {checkpoint['created']} ({checkpoint['pages_crawled']} pages crawled)")
+    else:
+        for url in URLManager.load_visited():
+            visited.add(CrawlerUtils.canonicalize(url))
+    if args.incremental:
+        if mongo_manager.collection is None:
+            logger.warning("Incremental mode needs MongoDB; every page will be fetched in full.")
+        else:
+            # Fresh pages count as visited so links to them are not followed again before they are due
+            due, fresh = revisits.load(mongo_manager.collection)
+            for url in fresh:
+                visited.add(url)
+            queue.extend(due)
+            logger.info(f"Incremental crawl: {len(due)} stored pages due for a revisit, {len(fresh)} still fresh")
     
     # Initialize with either user-provided URL or random seed URL
-    if not queue:
+    if not queue and not checkpoint:
         if args.start_url and CrawlerUtils.is_valid_onion_url(args.start_url):
             queue.append(args.start_url)
             logger.info(f"Starting with user-specified URL: {args.start_url}")
@@ -423,55 +2802,27 @@ async def main(args):
             if args.start_url:
                 logger.warning(f"Invalid start URL provided: {args.start_url}. Using random seed URL.")
     
-    for url in visited_set:
-        visited.add(url)
-    connector = ProxyConnector.from_url(CONFIG['TOR_PROXY'])
+    parser = ParsePool(matcher=args.matcher)
+    archive = PageArchive(CONFIG['RAW_PAGES_DIR'])
+    fingerprints.open(os.path.join(CONFIG['DATA_DIR'], CONFIG['FINGERPRINT_FILE']))
+    asyncio.get_running_loop().add_signal_handler(signal.SIGINT, request_shutdown)
+    if args.metrics_port:
+        try:
+            await metrics.serve(CONFIG['METRICS_HOST'], args.metrics_port)
+            logger.info(f"Serving metrics on http://{CONFIG['METRICS_HOST']}:{args.metrics_port}/metrics")
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on port {args.metrics_port}: {e}")
     
-    async with aiohttp.ClientSession(connector=connector) as session:
+    async with TorPool(proxies, connector) as session:
         tqdm.set_lock(tqdm.get_lock())
-        progress = tqdm_asyncio(total=len(visited_set), desc="Crawling Progress", position=0)
-        
-        while not time_limit_reached:
-            # Check if time limit has been reached
-            if datetime.now() - start_time > time_limit:
-                logger.info(f"Time limit of {args.time} minutes reached. Stopping crawler.")
-                time_limit_reached = True
-                break
-                
-            # If queue is empty, add a random seed URL to continue crawling
-            if not queue:
-                random_url = random.choice(SEED_URLS)
-                if random_url not in visited and random_url not in queue_filter:
-                    queue.append(random_url)
-                    queue_filter.add(random_url)
-                    logger.info(f"Queue empty. Added random seed URL: {random_url}")
-                else:
-                    logger.info("Queue empty and all seed URLs already visited. Waiting...")
-                    await asyncio.sleep(5)
-                    continue
-                    
-            # Process a batch of URLs
-            concurrency, delay = await CrawlerUtils.check_system_resources()
-            batch = queue[:concurrency]
-            queue = queue[concurrency:]
-            
-            results = await tqdm_asyncio.gather(*[crawl(url, session, mongo_manager, args.keyword) for url in batch])
-            
-            for html, url, new_links in results:
-                if html and new_links:
-                    tqdm.write(f"Found {len(new_links)} new links on {url}")
-                for link in new_links:
-                    if (CrawlerUtils.is_valid_onion_url(link) and link not in visited and link not in queue_filter):
-                        queue.append(link)
-                        queue_filter.add(link)
-                if url not in visited:
-                    visited.add(url)
-                    URLManager.save_visited(url)
-                    progress.update(1)
-                    progress.total = len(visited)
-            
-            URLManager.save_queue(queue)
-            await asyncio.sleep(delay)
+        progress = tqdm_asyncio(total=len(visited), desc="Crawling Progress", position=0)
+        scheduler = CrawlScheduler(session, mongo_manager, progress, matcher=args.matcher, parser=parser, archive=archive, frontier=frontier)
+        if checkpoint:
+            host_health.restore(checkpoint.get('hosts', {}))
+            scheduler.restore(itertools.chain(checkpoint['in_flight'], queue))
+        else:
+            scheduler.seed(queue)
+        await scheduler.run(start_time + time_limit)
         
         progress.close()
         if time_limit_reached:
@@ -479,18 +2830,14 @@ async def main(args):
         else:
             logger.info("Crawling completed. No more URLs to crawl.")
     
-    mongo_manager.close()
-
-def parse_arguments():
-    # Initialize colorama early
-    if COLORAMA_AVAILABLE:
-        init()
-
-    # Show help if requested
-    if '-h' in sys.argv or '--help' in sys.argv:
-        show_help()
-        sys.exit(0)
+    parser.close()
+    await mongo_manager.close()
+    await archive.close()
+    fingerprints.close()
+    await metrics.close()
+    URLManager.close_journals()
 
+def build_arg_parser():
     parser = argparse.ArgumentParser(
         description="Nemesis - A Dark Web Crawler for .onion Sites",
         formatter_class=argparse.RawTextHelpFormatter,
@@ -499,9 +2846,24 @@ def parse_arguments():
     parser.add_argument(
         '-k', '--keyword',
         type=str,
+        action='append',
         help='Crawl and filter URLs containing the specified keyword\n'
+             'Repeat to watch several keywords in the same crawl\n'
              'Saves matches to keyword_matches.txt in the output subdirectory'
     )
+    parser.add_argument(
+        '-K', '--keywords-file',
+        type=str,
+        help='Read keywords from a file, one per line\n'
+             'Lines starting with re: are regexes, lines starting with # are ignored'
+    )
+    parser.add_argument(
+        '-x', '--regex',
+        type=str,
+        action='append',
+        help='Crawl and filter URLs matching the specified regex (case-insensitive)\n'
+             'Repeat to watch several patterns'
+    )
     parser.add_argument(
         '-t', '--time',
         type=int,
@@ -521,23 +2883,167 @@ def parse_arguments():
              'Creates a subdirectory named <keyword>_<number> (e.g., modi_1)\n'
              'Default: data/ (creates numbered subdirectories)'
     )
+    parser.add_argument(
+        '-r', '--resume',
+        type=str,
+        help='Resume an interrupted crawl from its output subdirectory\n'
+             'Loads checkpoint.bin and the on-disk frontier (e.g., data/modi_1)'
+    )
+    parser.add_argument(
+        '-i', '--incremental',
+        action='store_true',
+        help='Keep pages from earlier runs in MongoDB and revisit them when they are due\n'
+             'Sends If-None-Match/If-Modified-Since and skips pages that have not changed'
+    )
+    parser.add_argument(
+        '-c', '--cluster',
+        action='store_true',
+        help='Share the frontier and visited set with other nodes through MongoDB\n'
+             'Start the same command on every machine pointing at the same MONGO_URI'
+    )
+    parser.add_argument(
+        '--node-id',
+        type=str,
+        help='Name of this node in cluster mode (default: <hostname>-<pid>)'
+    )
+    parser.add_argument(
+        '-p', '--proxy',
+        type=str,
+        action='append',
+        help='Tor SOCKS endpoint to crawl through (default: socks5://127.0.0.1:9050)\n'
+             'Repeat to spread requests over several Tor clients'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=CONFIG['METRICS_PORT'],
+        help=f"Serve Prometheus metrics on 127.0.0.1:<port>/metrics (0 disables, default: {CONFIG['METRICS_PORT']})\n"
+             'Stats are also written to stats.json in the output subdirectory'
+    )
     parser.add_argument(
         '-h', '--help',
         action='store_true',
         help='Show this help message and exit'
     )
+    return parser
+
+def build_reprocess_parser():
+    parser = argparse.ArgumentParser(
+        prog='nemesis reprocess',
+        description="Re-run link extraction and keyword matching over a finished crawl without touching the network",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        'directory',
+        type=str,
+        help='Output subdirectory of an earlier crawl (e.g., data/crypto_1)'
+    )
+    parser.add_argument(
+        '-k', '--keyword',
+        type=str,
+        action='append',
+        help='Keyword to match (repeatable); defaults to the keywords of the original crawl'
+    )
+    parser.add_argument(
+        '-K', '--keywords-file',
+        type=str,
+        help='Read keywords from a file, one per line (prefix regexes with re:)'
+    )
+    parser.add_argument(
+        '-x', '--regex',
+        type=str,
+        action='append',
+        help='Case-insensitive regex to match (repeatable)'
+    )
+    parser.add_argument(
+        '--source',
+        choices=['archive', 'mongo'],
+        default='archive',
+        help='Read pages from the raw_pages/ archive (default) or from the MongoDB HTML blobs'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=CONFIG['PARSE_WORKERS'],
+        help=f"Parse processes (default: {CONFIG['PARSE_WORKERS']})"
+    )
+    parser.add_argument(
+        '--no-mongo',
+        action='store_true',
+        help='Only rewrite keyword_matches.txt, leave MongoDB untouched'
+    )
+    return parser
+
+def reprocess(argv):
+    args = build_reprocess_parser().parse_args(argv)
+    try:
+        matcher = KeywordMatcher.from_args(args.keyword, args.keywords_file, args.regex)
+    except (OSError, re.error) as e:
+        print(f"Error: Invalid keywords: {e}")
+        sys.exit(1)
+    if args.source == 'mongo' and args.no_mongo:
+        print("Error: --source mongo needs MongoDB.")
+        sys.exit(1)
+    CONFIG['DATA_DIR'] = os.path.abspath(args.directory)
+    CONFIG['RAW_PAGES_DIR'] = os.path.join(CONFIG['DATA_DIR'], 'raw_pages')
+    if args.source == 'archive' and not os.path.exists(os.path.join(CONFIG['RAW_PAGES_DIR'], CONFIG['ARCHIVE_INDEX'])):
+        print(f"Error: No page archive found in {CONFIG['RAW_PAGES_DIR']}")
+        sys.exit(1)
     
-    args = parser.parse_args()
+    logger.setLevel(logging.INFO)
+    logger.handlers = [logging.StreamHandler(sys.stderr)]
+    logger.handlers[0].setFormatter(logging.Formatter(fmt='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    
+    if not matcher:
+        # Without new keywords, the keywords of the original crawl are matched again
+        checkpoint = CheckpointManager.load_meta()
+        if checkpoint:
+            matcher = KeywordMatcher(checkpoint.get('keywords', []), checkpoint.get('regexes', []))
+    matcher = matcher or None
+    logger.info(f"Reprocessing {CONFIG['DATA_DIR']} from {args.source} with {args.workers} workers (Keywords: {matcher or 'None'})")
+    
+    reprocessor = Reprocessor(CONFIG['DATA_DIR'], matcher, args.workers, mongo=not args.no_mongo)
+    if args.source == 'mongo' and reprocessor.client is None:
+        logger.error("--source mongo needs MongoDB.")
+        sys.exit(1)
+    started = time.monotonic()
+    try:
+        reprocessor.run(args.source)
+    finally:
+        reprocessor.close()
+    elapsed = time.monotonic() - started
+    logger.info(f"Reprocessed {reprocessor.pages} pages in {elapsed:.1f}s ({reprocessor.pages / max(elapsed, 1e-9):.1f} pages/s) "
+                f"plus {reprocessor.duplicates} duplicates, {len(reprocessor.matches)} keyword matches")
+
+def parse_arguments():
+    # Initialize colorama early
+    if COLORAMA_AVAILABLE:
+        init()
+
+    # Show help if requested
+    if '-h' in sys.argv or '--help' in sys.argv:
+        show_help()
+        sys.exit(0)
+
+    args = build_arg_parser().parse_args()
     if args.time < 10 or args.time > 180:
         print("Error: Time limit must be between 10 and 180 minutes.")
         show_help()
         sys.exit(1)
+    try:
+        args.matcher = KeywordMatcher.from_args(args.keyword, args.keywords_file, args.regex)
+    except (OSError, re.error) as e:
+        print(f"Error: Invalid keywords: {e}")
+        sys.exit(1)
     return args
 
 if __name__ == "__main__":
     try:
-        args = parse_arguments()
-        asyncio.run(main(args))
+        if sys.argv[1:2] == ['reprocess']:
+            reprocess(sys.argv[2:])
+        else:
+            args = parse_arguments()
+            asyncio.run(main(args))
     except KeyboardInterrupt:
         logger.info("Crawler stopped by user. Data saved.")
     except Exception as e:
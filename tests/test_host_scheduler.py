@@ -0,0 +1,42 @@
+import asyncio
+
+from nemesis import HostScheduler, SQLiteFrontier
+
+def host(i):
+    return f"{i:056d}.onion"
+
+async def serve(path, items, workers, spacing, seconds):
+    # Built inside the running loop, since before Python 3.10 an asyncio.Queue binds to the loop it is created in
+    frontier = SQLiteFrontier(path)
+    for item in items:
+        frontier.put_nowait(item)
+    scheduler = HostScheduler(frontier)
+    scheduler.workers = workers
+    scheduler.spacing = spacing
+    scheduler.start()
+    served = []
+
+    async def worker():
+        while True:
+            url, _ = await scheduler.get()
+            served.append(url)
+            await asyncio.sleep(0.01)
+            scheduler.done(url)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await scheduler.close()
+    frontier.close()
+    return served
+
+def test_run_of_one_host_does_not_block_the_others(tmp_path):
+    # The whole top of the frontier is one host, so every other host sits behind it
+    items = [(f"http://{host(0)}/p/{i}", 1.0, 1) for i in range(200)]
+    items += [(f"http://{host(1 + i % 20)}/p/{i}", 0.5, 1) for i in range(200)]
+    served = asyncio.run(serve(str(tmp_path / 'frontier.db'), items, workers=8, spacing=1.0, seconds=0.5))
+    # Within one spacing interval each host can be served once, so progress has to come from the other hosts
+    assert sum(host(0) in url for url in served) == 1
+    assert len(served) >= 8
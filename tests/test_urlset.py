@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from nemesis import CONFIG, CrawlerUtils, URLSet
+
+ONION = "uzuf6o3c2v57ysjveyyuboxip7guqcejoxbdrqoiivp2frywmwo66e2p.onion"
+
+def test_add_and_contains():
+    urls = URLSet()
+    assert not urls.add(f"http://{ONION}/a")
+    assert urls.add(f"http://{ONION}/a")
+    assert f"http://{ONION}/a" in urls
+    assert f"http://{ONION}/b" not in urls
+    assert f"https://{ONION}/a" not in urls
+    assert "http://unknown.onion/a" not in urls
+    assert len(urls) == 1
+
+def test_non_onion_hosts_are_stored_verbatim():
+    urls = URLSet()
+    urls.add("https://hidden.wiki/")
+    assert "https://hidden.wiki/" in urls
+    assert "https://hidden.wiki/x" not in urls
+
+def test_grow_keeps_every_url():
+    urls = URLSet(capacity=8)
+    expected = [f"http://{ONION}/p/{i}?q={i % 7}" for i in range(5000)]
+    for url in expected:
+        assert not urls.add(url)
+    assert len(urls) == len(expected)
+    assert len(urls._offsets) > 8
+    assert all(url in urls for url in expected)
+    assert f"http://{ONION}/p/5000?q=0" not in urls
+
+def test_file_round_trip():
+    urls = URLSet(capacity=8)
+    for i in range(100):
+        urls.add(f"http://{ONION}/p/{i}")
+    urls.add("https://hidden.wiki/")
+    buffer = io.BytesIO()
+    urls.tofile(buffer)
+    buffer.write(b"trailing data")
+    buffer.seek(0)
+    restored = URLSet.fromfile(buffer)
+    assert buffer.read() == b"trailing data"
+    assert len(restored) == len(urls)
+    assert all(f"http://{ONION}/p/{i}" in restored for i in range(100))
+    assert "https://hidden.wiki/" in restored
+    assert f"http://{ONION}/p/100" not in restored
+    # A restored set keeps growing like a fresh one
+    for i in range(100, 1000):
+        assert not restored.add(f"http://{ONION}/p/{i}")
+    assert all(f"http://{ONION}/p/{i}" in restored for i in range(1000))
+
+@pytest.mark.parametrize("url", [
+    f"http://{ONION}",
+    f"http://{ONION}/",
+    f"http://{ONION}/#a",
+    f"HTTP://{ONION.upper()}/",
+    f"http://{ONION}:80/",
+    f"http://user@{ONION}/",
+])
+def test_canonicalize_site_root(url):
+    assert CrawlerUtils.canonicalize(url) == f"http://{ONION}/"
+
+@pytest.mark.parametrize("url, expected", [
+    (f"http://{ONION}/forum/", f"http://{ONION}/forum"),
+    (f"http://{ONION}/forum//", f"http://{ONION}/forum"),
+    (f"https://{ONION}:443/forum", f"https://{ONION}/forum"),
+    (f"http://{ONION}:8080/forum", f"http://{ONION}:8080/forum"),
+    (f"http://{ONION}/Forum?b=2&a=1#top", f"http://{ONION}/Forum?b=2&a=1"),
+])
+def test_canonicalize(url, expected):
+    assert CrawlerUtils.canonicalize(url) == expected
+
+def test_canonicalize_keeps_trailing_slash_when_disabled(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'STRIP_TRAILING_SLASH', False)
+    assert CrawlerUtils.canonicalize(f"http://{ONION}/forum/") == f"http://{ONION}/forum/"
+
+def test_canonicalize_sorts_query_params(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'SORT_QUERY_PARAMS', True)
+    assert CrawlerUtils.canonicalize(f"http://{ONION}/s?q=x&a=%20") == f"http://{ONION}/s?a=%20&q=x"